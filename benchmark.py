@@ -0,0 +1,278 @@
+"""
+Benchmark of the futoshiki solver configurations.
+
+Solves every board of futoshiki_start.txt with each combination of domain
+engine (futoshiki.ENGINES), propagation (futoshiki.PROPAGATIONS) and search
+heuristic (futoshiki.HEURISTICS) and search algorithm (futoshiki.SEARCHES)
+and prints the runtime statistics and the number of search nodes of each one.
+
+$python3 benchmark.py [--repeat N] [--engines list bitset] [--propagations fc gac] [--heuristics mrv degree]
+                      [--searches backtracking backjump nogoods dlx]
+
+With --scaling, solves reproducible sets of random boards instead, one set per
+size, clue density and inequality density, and prints the p50/p95/p99
+latency, the search nodes per second and the peak memory of every solver
+configuration. --json writes the same results to a file and --compare prints
+the ratios between two such files. --hard keeps only the random boards that
+chronological backtracking needs at least that many nodes for, which is where
+backjumping and nogood learning pay off.
+
+$python3 benchmark.py --scaling 4 5 6 7 8 9 [--clues 0.5 0.7] [--inequalities 0.3] [--boards N] [--seed S] [--json PATH]
+$python3 benchmark.py --scaling 8 9 --clues 0.3 --hard 2000 --engines bitset --searches backtracking backjump nogoods
+$python3 benchmark.py --compare old.json new.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from futoshiki import (ENGINES, HEURISTICS, PROPAGATIONS, SEARCHES, BitsetBoard, solve_board_iterative,
+                       solve_built_board, print_stats)
+from generator import random_puzzle
+
+
+def read_boards(src_filename):
+    '''
+    Returns the configuration strings found in src_filename, skipping blank lines
+    '''
+    with open(src_filename, "r") as srcfile:
+        return [line.strip() for line in srcfile if line.strip()]
+
+
+def run_engine(board_class, config_strings, repeat, propagation='fc', heuristic='mrv', search='backtracking'):
+    '''
+    Solves every board repeat times with board_class and the given propagation, heuristic and search.
+    Returns the runtimes (construction included), the search nodes of one round
+    and the solved strings of one round (None for a board left unsolved)
+    '''
+    runtimes = []
+    nodes = 0
+    solutions = []
+    for _ in range(repeat):
+        nodes = 0
+        solutions = []
+        for config_string in config_strings:
+            start_time = time.time()
+            board = board_class(config_string)
+            solved_str, _ = solve_built_board(board, propagation, heuristic, search=search)
+            runtimes.append(time.time() - start_time)
+            nodes += board.nodes
+            solutions.append(solved_str)
+    return runtimes, nodes, solutions
+
+
+def is_solution(config_string, solved_string):
+    '''
+    Returns True if solved_string fills every cell of config_string and keeps its clues and constraints
+    '''
+    board = ENGINES['list'](config_string)
+    solved_board = ENGINES['list'](solved_string)
+    return solved_board.contradiction is None and 0 not in solved_board.values and \
+        solved_board.less_pairs == board.less_pairs and \
+        all(value == 0 or value == solved for value, solved in zip(board.values, solved_board.values))
+
+
+def puzzle_set(n, clue_density, inequality_density, boards, seed=0):
+    '''
+    Returns boards random puzzles of size n. The same arguments always give the same puzzles
+    '''
+    rng = random.Random("%d:%d:%r:%r" % (seed, n, clue_density, inequality_density))
+    return [random_puzzle(n, clue_density, inequality_density, rng)[0] for _ in range(boards)]
+
+
+def hard_set(n, clue_density, inequality_density, boards, seed=0, min_nodes=1000, max_nodes=200000, tries=50):
+    '''
+    Returns up to boards random puzzles of size n that the chronological search (bitset engine, fc, mrv)
+    solves in min_nodes to max_nodes nodes, out of at most tries * boards puzzles drawn.
+    The same arguments always give the same puzzles
+    '''
+    rng = random.Random("hard:%d:%d:%r:%r" % (seed, n, clue_density, inequality_density))
+    config_strings = []
+    for _ in range(tries * boards):
+        config_string = random_puzzle(n, clue_density, inequality_density, rng)[0]
+        board = BitsetBoard(config_string)
+        status, _, _ = solve_board_iterative(board, max_nodes=max_nodes)
+        if status == 'solved' and board.nodes >= min_nodes:
+            config_strings.append(config_string)
+            if len(config_strings) == boards:
+                break
+    return config_strings
+
+
+def measure(board_class, config_strings, propagation='fc', heuristic='mrv', search='backtracking'):
+    '''
+    Solves every board once and returns the metrics of the run: latency percentiles (construction included),
+    search nodes per second and peak memory.
+    The memory is measured in a second pass because tracemalloc slows the solver down
+    '''
+    runtimes = []
+    nodes = 0
+    unsolved = 0
+    for config_string in config_strings:
+        start_time = time.time()
+        board = board_class(config_string)
+        solved_str, _ = solve_built_board(board, propagation, heuristic, search=search)
+        runtimes.append(time.time() - start_time)
+        nodes += board.nodes
+        if solved_str is None:
+            unsolved += 1
+
+    peak = 0
+    for config_string in config_strings:
+        tracemalloc.start()
+        solve_built_board(board_class(config_string), propagation, heuristic, search=search)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(runtimes, [50, 95, 99])
+    total = sum(runtimes)
+    return {
+        'boards': len(config_strings),
+        'unsolved': unsolved,
+        'mean': total / len(runtimes),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': max(runtimes),
+        'nodes': nodes,
+        'nodes_per_sec': nodes / total if total else 0.0,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_suite(engines, propagations, sizes, clue_densities, inequality_densities, boards, seed=0, heuristics=('mrv',),
+              searches=('backtracking',), hard=None):
+    '''
+    Measures every engine, propagation, heuristic and search on a puzzle set per size, clue density and
+    inequality density, only boards needing at least hard nodes (see hard_set()) when hard is given.
+    Yields one dict of metrics per combination
+    '''
+    for n in sizes:
+        for clue_density in clue_densities:
+            for inequality_density in inequality_densities:
+                if hard is None:
+                    config_strings = puzzle_set(n, clue_density, inequality_density, boards, seed)
+                else:
+                    config_strings = hard_set(n, clue_density, inequality_density, boards, seed, hard)
+                    if not config_strings:
+                        continue
+                combinations = itertools.product(engines, propagations, heuristics, searches)
+                for engine, propagation, heuristic, search in combinations:
+                    result = {
+                        'engine': engine,
+                        'propagation': propagation,
+                        'heuristic': heuristic,
+                        'search': search,
+                        'n': n,
+                        'clues': clue_density,
+                        'inequalities': inequality_density,
+                    }
+                    result.update(measure(ENGINES[engine], config_strings, propagation, heuristic, search))
+                    yield result
+
+
+def result_key(result):
+    # reports written before the heuristics and searches were added all used mrv and backtracking
+    return (result['engine'], result['propagation'], result.get('heuristic', 'mrv'),
+            result.get('search', 'backtracking'), result['n'], result['clues'], result['inequalities'])
+
+
+def compare(old_filename, new_filename):
+    '''
+    Prints the ratio new / old of the latencies and of the throughput of two JSON reports
+    '''
+    with open(old_filename) as old_file, open(new_filename) as new_file:
+        old = {result_key(result): result for result in json.load(old_file)['results']}
+        new = {result_key(result): result for result in json.load(new_file)['results']}
+    print("{:>8s} {:>8s} {:>8s} {:>12s} {:>3s} {:>6s} {:>6s} {:>8s} {:>8s} {:>8s} {:>10s}".format(
+        "engine", "prop", "heur", "search", "n", "clues", "ineq", "p50", "p95", "p99", "nodes/s"))
+    for key in sorted(set(old) & set(new)):
+        ratios = [new[key][metric] / old[key][metric] if old[key][metric] else float('nan')
+                  for metric in ('p50', 'p95', 'p99', 'nodes_per_sec')]
+        print("{:>8s} {:>8s} {:>8s} {:>12s} {:3d} {:6.2f} {:6.2f} {:7.2f}x {:7.2f}x {:7.2f}x {:9.2f}x".format(*(key + tuple(ratios))))
+    for key in sorted(set(old) ^ set(new)):
+        print("only in %s: %s" % (old_filename if key in old else new_filename, key))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the futoshiki solver configurations")
+    parser.add_argument('--input', default='futoshiki_start.txt', help="file with one board per line")
+    parser.add_argument('--repeat', type=int, default=3, help="number of times each board is solved")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES, reverse=True))
+    parser.add_argument('--propagations', nargs='+', choices=PROPAGATIONS, default=['fc'])
+    parser.add_argument('--heuristics', nargs='+', choices=HEURISTICS, default=['mrv'])
+    parser.add_argument('--searches', nargs='+', choices=SEARCHES, default=['backtracking'])
+    parser.add_argument('--scaling', nargs='+', type=int, metavar='N', help="sizes of the random boards to solve")
+    parser.add_argument('--boards', type=int, default=5, help="random boards per puzzle set with --scaling")
+    parser.add_argument('--clues', nargs='+', type=float, default=[0.7], help="clue densities of the random boards")
+    parser.add_argument('--inequalities', nargs='+', type=float, default=[0.3],
+                        help="inequality densities of the random boards")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the puzzle sets")
+    parser.add_argument('--hard', type=int, metavar='NODES', default=None,
+                        help="with --scaling, only boards the chronological search needs at least NODES nodes for")
+    parser.add_argument('--json', metavar='PATH', help="with --scaling, also write the results to PATH")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        exit()
+
+    if args.scaling:
+        results = []
+        print("{:>8s} {:>8s} {:>8s} {:>12s} {:>3s} {:>6s} {:>6s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>8s}".format(
+            "engine", "prop", "heur", "search", "n", "clues", "ineq", "p50 (ms)", "p95 (ms)", "p99 (ms)", "nodes/s", "peak (KiB)", "unsolved"))
+        for result in run_suite(args.engines, args.propagations, args.scaling, args.clues, args.inequalities,
+                                args.boards, args.seed, args.heuristics, args.searches, args.hard):
+            results.append(result)
+            print("{engine:>8s} {propagation:>8s} {heuristic:>8s} {search:>12s} {n:3d} {clues:6.2f} {inequalities:6.2f} {p50_ms:10.3f} {p95_ms:10.3f} "
+                  "{p99_ms:10.3f} {nodes_per_sec:10.0f} {peak_kib:10.1f} {unsolved:8d}".format(
+                      p50_ms=result['p50'] * 1000, p95_ms=result['p95'] * 1000, p99_ms=result['p99'] * 1000, **result),
+                  flush=True)
+        if args.json:
+            report = {
+                'settings': {'boards': args.boards, 'seed': args.seed, 'hard': args.hard,
+                             'python': platform.python_version()},
+                'results': results,
+            }
+            with open(args.json, "w") as jsonfile:
+                json.dump(report, jsonfile, indent=1, sort_keys=True)
+        exit()
+
+    config_strings = read_boards(args.input)
+    results = []
+    reference = None  # name and solutions of the first configuration
+    for name in args.engines:
+        for propagation in args.propagations:
+            for heuristic in args.heuristics:
+                for search in args.searches:
+                    runtimes, nodes, solutions = run_engine(ENGINES[name], config_strings, args.repeat, propagation,
+                                                            heuristic, search)
+                    unsolved = solutions.count(None)
+                    configuration = "/".join((name, propagation, heuristic, search))
+                    if reference is None:
+                        reference = configuration, solutions
+                    # boards with several solutions may be solved differently, only the verdicts must agree
+                    for config_string, solved_string, expected in zip(config_strings, solutions, reference[1]):
+                        if (solved_string is None) != (expected is None):
+                            print("%s disagrees with %s on %s" % (configuration, reference[0], config_string))
+                        elif solved_string is not None and not is_solution(config_string, solved_string):
+                            print("%s gave a wrong solution for %s" % (configuration, config_string))
+                    results.append((name, propagation, heuristic, search, sum(runtimes) / args.repeat, nodes))
+                    print("\nEngine: %s, propagation: %s, heuristic: %s, search: %s" % (name, propagation, heuristic,
+                                                                                       search))
+                    print_stats(runtimes)
+                    print("Search Nodes = {:d}".format(nodes))
+                    if unsolved:
+                        print("Unsolved Boards = {:d}".format(unsolved))
+
+    baseline = results[0][4]
+    print("\nAgainst %s/%s/%s/%s (time per round, search nodes):" % results[0][:4])
+    for name, propagation, heuristic, search, runtime, nodes in results:
+        print("{:s}/{:s}/{:s}/{:s} = {:.2f}x, {:.6f}s, {:d} nodes".format(name, propagation, heuristic, search,
+                                                                       baseline / runtime, runtime, nodes))
@@ -0,0 +1,239 @@
+"""
+Binary puzzle corpus.
+
+A corpus holds boards of one size n as fixed-size records after a 16 byte
+header: the magic b'FUTO', the format version, n and the bits per cell (one
+byte each), an unused byte and the number of records (8 bytes, little endian).
+
+A record is the n*n cell values, packed 2 per byte (4 bits each) up to 15x15
+and 1 per byte above, followed by 2 bit planes over the 2n(n-1) pairs of
+adjacent cells (the horizontal pairs row by row, then the vertical ones):
+'the pair has an inequality' and 'the first cell is the smaller one', each
+padded to whole bytes. A 9x9 board takes 77 bytes instead of a 226 character
+line.
+
+The file is memory-mapped and decoded a block of records at a time with
+numpy, so batch mode reads boards without parsing any text. futoshiki.py
+uses it when --input is a corpus.
+
+$python3 corpus.py pack boards.txt boards.bin
+$python3 corpus.py unpack boards.bin boards.txt
+"""
+import argparse
+import itertools
+import multiprocessing
+import struct
+
+import numpy as np
+
+from futoshiki import DELIMITER, ENGINES, parse_config, render_tokens, solve_built_board
+
+MAGIC = b'FUTO'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxQ')  # magic, version, n, bits per cell, number of records
+SIGNS = ('-', '<', '>')  # sign codes of the decoded pairs
+
+
+def record_layout(n):
+    '''
+    Returns the bits per cell, the bytes of the cells, the bytes of one bit plane and the record size for side n
+    '''
+    cell_bits = 4 if n <= 15 else 8
+    cell_bytes = (n * n * cell_bits + 7) // 8
+    plane_bytes = (2 * n * (n - 1) + 7) // 8
+    return cell_bits, cell_bytes, plane_bytes, cell_bytes + 2 * plane_bytes
+
+
+def pair_cells(n):
+    '''
+    Returns the first cell of every pair of adjacent cells, horizontal pairs then vertical pairs
+    '''
+    horizontal = [row * n + col for row in range(n) for col in range(n - 1)]
+    vertical = [row * n + col for row in range(n - 1) for col in range(n)]
+    return horizontal, vertical
+
+
+def is_corpus(path):
+    with open(path, "rb") as corpusfile:
+        return corpusfile.read(len(MAGIC)) == MAGIC
+
+
+def encode(n, boards):
+    '''
+    Returns the records of boards, given as parsed (values, right, down) triples of side n, as a uint8 array
+    '''
+    cell_bits, cell_bytes, plane_bytes, record_size = record_layout(n)
+    horizontal, vertical = pair_cells(n)
+    values = np.array([board[0] for board in boards], dtype=np.uint8).reshape(len(boards), n * n)
+    signs = np.array([[board[1][var] for var in horizontal] + [board[2][var] for var in vertical]
+                      for board in boards]).reshape(len(boards), len(horizontal) + len(vertical))
+
+    records = np.zeros((len(boards), record_size), dtype=np.uint8)
+    if cell_bits == 4:
+        padded = np.zeros((len(boards), 2 * cell_bytes), dtype=np.uint8)
+        padded[:, :n * n] = values
+        records[:, :cell_bytes] = (padded[:, 0::2] << 4) | padded[:, 1::2]
+    else:
+        records[:, :cell_bytes] = values
+    records[:, cell_bytes:cell_bytes + plane_bytes] = np.packbits(signs != '-', axis=1)
+    records[:, cell_bytes + plane_bytes:] = np.packbits(signs == '<', axis=1)
+    return records
+
+
+def write_corpus(path, config_strings, block=4096):
+    '''
+    Writes the boards of config_strings, all of one size, to the corpus file path, block boards at a time.
+    Every board is validated by futoshiki.parse_config(). Returns the number of boards written
+    '''
+    config_strings = iter(config_strings)
+    count = 0
+    n = None
+    with open(path, "wb") as corpusfile:
+        corpusfile.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))  # rewritten once n and the count are known
+        for chunk in iter(lambda: list(itertools.islice(config_strings, block)), []):
+            boards = []
+            for config_string in chunk:
+                board_n, _, values, right, down = parse_config(config_string)
+                if n is None:
+                    n = board_n
+                if board_n != n:
+                    raise Exception("All the boards of a corpus must have the same size, got %d after %d" % (board_n, n))
+                boards.append((values, right, down))
+            corpusfile.write(encode(n, boards).tobytes())
+            count += len(boards)
+        if n is None:
+            raise Exception("No board to write")
+        corpusfile.seek(0)
+        corpusfile.write(HEADER.pack(MAGIC, VERSION, n, record_layout(n)[0], count))
+    return count
+
+
+class Corpus:
+    '''
+    Read-only, memory-mapped view of a corpus file
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, n, cell_bits, count = HEADER.unpack(data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise Exception("%s is not a futoshiki corpus" % path)
+        if version != VERSION:
+            raise Exception("Unsupported corpus version %d" % version)
+        self.n = n
+        self.cell_bits, self.cell_bytes, self.plane_bytes, record_size = record_layout(n)
+        if cell_bits != self.cell_bits or len(data) != HEADER.size + count * record_size:
+            raise Exception("Corrupted corpus %s" % path)
+        self.records = data[HEADER.size:].reshape(count, record_size)
+        self.horizontal, self.vertical = pair_cells(n)
+
+    def __len__(self):
+        return len(self.records)
+
+    def decode(self, start, stop):
+        '''
+        Returns the values (boards, n*n) and the sign codes (index in SIGNS) of the right and lower neighbour
+        of every cell (boards, n*n) of the records start..stop-1
+        '''
+        n = self.n
+        block = self.records[start:stop]
+        cells = block[:, :self.cell_bytes]
+        if self.cell_bits == 4:
+            values = np.empty((len(block), 2 * self.cell_bytes), dtype=np.uint8)
+            values[:, 0::2] = cells >> 4
+            values[:, 1::2] = cells & 15
+            values = values[:, :n * n]
+        else:
+            values = cells
+        pairs = 2 * n * (n - 1)
+        constrained = np.unpackbits(block[:, self.cell_bytes:self.cell_bytes + self.plane_bytes], axis=1)[:, :pairs]
+        smaller = np.unpackbits(block[:, self.cell_bytes + self.plane_bytes:], axis=1)[:, :pairs]
+        codes = constrained * (2 - smaller)  # 0 '-', 1 '<', 2 '>'
+
+        right = np.zeros((len(block), n * n), dtype=np.uint8)
+        down = np.zeros((len(block), n * n), dtype=np.uint8)
+        right[:, self.horizontal] = codes[:, :len(self.horizontal)]
+        down[:, self.vertical] = codes[:, len(self.horizontal):]
+        return values, right, down
+
+    def cells(self, start=0, stop=None):
+        '''
+        Yields the values, right signs and lower signs of the records start..stop-1, as lists
+        '''
+        values, right, down = self.decode(start, len(self) if stop is None else stop)
+        for board_values, board_right, board_down in zip(values.tolist(), right.tolist(), down.tolist()):
+            yield board_values, [SIGNS[code] for code in board_right], [SIGNS[code] for code in board_down]
+
+    def boards(self, start=0, stop=None, board_class=None):
+        '''
+        Yields the boards of the records start..stop-1, built without parsing a string
+        '''
+        board_class = board_class or ENGINES['list']
+        for cells in self.cells(start, stop):
+            yield board_class.from_cells(self.n, *cells)
+
+    def config_strings(self, start=0, stop=None):
+        '''
+        Yields the configuration strings of the records start..stop-1
+        '''
+        delimiter = DELIMITER if self.n > 9 else ''
+        for cells in self.cells(start, stop):
+            yield delimiter.join(render_tokens(self.n, *cells))
+
+
+def _solve_records(task):
+    # worker side of solve_corpus(): the worker maps the file itself, only the record range is sent.
+    # A record that is not a board gives (None, -1)
+    path, start, stop, options = task
+    options = dict(options)
+    board_class = ENGINES[options.pop('engine')]
+    corpus = Corpus(path)
+    results = []
+    for cells in corpus.cells(start, stop):
+        try:
+            board = board_class.from_cells(corpus.n, *cells)
+        except Exception:
+            results.append((None, -1))  # see futoshiki.board_error()
+            continue
+        results.append(solve_built_board(board, **options))
+    return results
+
+
+def solve_corpus(path, workers=1, chunksize=256, engine='list', propagation='fc', heuristic='mrv', timeout=None,
+                 max_nodes=None, search='backtracking', nogoods=10000):
+    '''
+    Solves every board of the corpus at path, chunksize records per task, on workers processes,
+    with the options of futoshiki.solve_built_board().
+    Yields, in corpus order, one list of (solved string or None, runtime) per chunk, None also for a record
+    that is not a board
+    '''
+    options = dict(engine=engine, propagation=propagation, heuristic=heuristic, timeout=timeout, max_nodes=max_nodes,
+                   search=search, nogoods=nogoods)
+    count = len(Corpus(path))
+    tasks = [(path, start, min(start + chunksize, count), options) for start in range(0, count, chunksize)]
+    if workers <= 1:
+        for task in tasks:
+            yield _solve_records(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for results in pool.imap(_solve_records, tasks):
+            yield results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert between text boards and a binary corpus")
+    parser.add_argument('command', choices=['pack', 'unpack'])
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        with open(args.source, "r") as srcfile:
+            count = write_corpus(args.destination, (line.strip() for line in srcfile if line.strip()))
+        print("Packed {:d} boards".format(count))
+    else:
+        with open(args.destination, "w") as outfile:
+            for config_string in Corpus(args.source).config_strings():
+                outfile.write(config_string)
+                outfile.write('\n')
@@ -0,0 +1,214 @@
+"""
+Dancing links (DLX) solver for futoshiki.
+
+Without its inequalities a futoshiki board is a Latin square, which is an
+exact cover problem: every cell, every (row, value) and every (column, value)
+must be covered exactly once by a placement (cell, value). The matrix has one
+row per placement left in the domains of the board and 3n^2 columns, held in
+Knuth's circular doubly linked lists so that covering a column and undoing it
+are pointer swaps.
+
+The inequalities are checked when a placement is chosen: the placements they
+rule out on the unassigned neighbours are hidden, the same way a column is
+covered, so the search always picks the column with the fewest placements
+left, inequalities included.
+
+solve_board_dlx() has the interface of futoshiki.solve_board(), see
+futoshiki.py --search dlx.
+"""
+import time
+
+
+class ExactCover:
+    '''
+    Dancing links matrix of a board, built from its current domains with the clues already chosen.
+    Nodes are indices into the link lists: 0 is the root, 1..3n^2 the column headers
+    (cells, then (row, value), then (column, value)) and every placement takes 3 nodes after them
+    '''
+
+    def __init__(self, board):
+        n = board.n
+        self.n = n
+        self.arcs = board.arcs
+        self.values = [0] * (n * n)  # value chosen for every cell, 0 while open
+        self.nodes = 0  # placements tried by search()
+
+        columns = 3 * n * n
+        self.left = [column - 1 for column in range(columns + 1)]
+        self.left[0] = columns
+        self.right = [column + 1 for column in range(columns + 1)]
+        self.right[columns] = 0
+        self.up = list(range(columns + 1))
+        self.down = list(range(columns + 1))
+        self.column = list(range(columns + 1))
+        self.size = [0] * (columns + 1)  # placements left in every column
+        self.placement = [None] * (columns + 1)  # (var, value) of every placement node
+
+        first = {}  # (var, value) -> first node of the placement
+        for var in range(n * n):
+            row, col = divmod(var, n)
+            for value in board.domain_values(var):
+                node = len(self.column)
+                first[(var, value)] = node
+                for offset, column in enumerate((1 + var, 1 + n * n + row * n + value - 1,
+                                                 1 + 2 * n * n + col * n + value - 1)):
+                    self.column.append(column)
+                    self.placement.append((var, value))
+                    self.left.append(node + (offset - 1) % 3)
+                    self.right.append(node + (offset + 1) % 3)
+                    # at the bottom of the column
+                    self.up.append(self.up[column])
+                    self.down.append(column)
+                    self.down[self.up[column]] = node + offset
+                    self.up[column] = node + offset
+                    self.size[column] += 1
+
+        for var, value in enumerate(board.values):
+            if value != 0:
+                self.choose(first[(var, value)])
+
+    def cover(self, column):
+        # removes column and every placement that covers it from the other columns
+        left, right, up, down, size, column_of = self.left, self.right, self.up, self.down, self.size, self.column
+        right[left[column]] = right[column]
+        left[right[column]] = left[column]
+        node = down[column]
+        while node != column:
+            other = right[node]
+            while other != node:
+                down[up[other]] = down[other]
+                up[down[other]] = up[other]
+                size[column_of[other]] -= 1
+                other = right[other]
+            node = down[node]
+
+    def uncover(self, column):
+        # exact reverse of cover()
+        left, right, up, down, size, column_of = self.left, self.right, self.up, self.down, self.size, self.column
+        node = up[column]
+        while node != column:
+            other = left[node]
+            while other != node:
+                size[column_of[other]] += 1
+                down[up[other]] = other
+                up[down[other]] = other
+                other = left[other]
+            node = up[node]
+        right[left[column]] = column
+        left[right[column]] = column
+
+    def hide(self, node):
+        # removes the placement of node from all its columns
+        right, up, down, size, column_of = self.right, self.up, self.down, self.size, self.column
+        other = node
+        while True:
+            down[up[other]] = down[other]
+            up[down[other]] = up[other]
+            size[column_of[other]] -= 1
+            other = right[other]
+            if other == node:
+                return
+
+    def unhide(self, node):
+        # exact reverse of hide()
+        left, up, down, size, column_of = self.left, self.up, self.down, self.size, self.column
+        other = left[node]
+        while True:
+            size[column_of[other]] += 1
+            down[up[other]] = other
+            up[down[other]] = other
+            if other == node:
+                return
+            other = left[other]
+
+    def choose(self, node):
+        '''
+        Chooses the placement of node: covers its 3 columns and hides the placements of the open inequality
+        neighbours that its value rules out. Returns the hidden nodes, for release()
+        '''
+        other = node
+        while True:
+            self.cover(self.column[other])
+            other = self.right[other]
+            if other == node:
+                break
+        var, value = self.placement[node]
+        self.values[var] = value
+        hidden = []
+        for neighbour, sign in self.arcs[var]:
+            if self.values[neighbour]:
+                continue  # its cell column is covered, and its value was checked when it was chosen
+            column = 1 + neighbour
+            other = self.down[column]
+            while other != column:
+                other_value = self.placement[other][1]
+                if other_value <= value if sign == '<' else other_value >= value:
+                    self.hide(other)
+                    hidden.append(other)
+                other = self.down[other]
+        return hidden
+
+    def release(self, node, hidden):
+        # exact reverse of choose()
+        for other in reversed(hidden):
+            self.unhide(other)
+        self.values[self.placement[node][0]] = 0
+        other = self.left[node]
+        while True:
+            self.uncover(self.column[other])
+            if other == node:
+                return
+            other = self.left[other]
+
+    def search(self):
+        '''
+        Algorithm X on the column with the fewest placements. Returns True with self.values complete,
+        False when there is no exact cover that keeps the inequalities
+        '''
+        right, size = self.right, self.size
+        column = right[0]
+        if column == 0:
+            return True
+        best = size[column]
+        other = right[column]
+        while other != 0 and best > 1:
+            if size[other] < best:
+                column = other
+                best = size[other]
+            other = right[other]
+        if best == 0:
+            return False
+        node = self.down[column]
+        while node != column:
+            self.nodes += 1
+            hidden = self.choose(node)
+            if self.search():
+                return True
+            self.release(node, hidden)
+            node = self.down[node]
+        return False
+
+
+def solve_board_dlx(board, propagation='fc', heuristic='mrv'):
+    '''
+    futoshiki.solve_board() with the exact cover search. propagation only applies before the matrix is built
+    and heuristic is ignored, the search always takes the column with the fewest placements.
+    Returns the solved board and the runtime
+    '''
+    start_time = time.time()
+    board.propagation = propagation
+    board.heuristic = heuristic
+    solved = False
+    if board.contradiction is None and (propagation == 'fc' or board.propagate(range(board.n * board.n))):
+        matrix = ExactCover(board)
+        solved = matrix.search()
+        board.nodes += matrix.nodes
+        if solved:
+            for var, value in enumerate(matrix.values):
+                board.values[var] = value
+                board.keep_value(var, value)
+            board.create_solved_board()
+    board.status = 'solved' if solved else 'unsat'
+    if not solved:
+        return None, -1
+    return board, time.time() - start_time
@@ -19,20 +19,138 @@ at A2
 
 Empty inequalities in the board are represented as '-'
 
+Boards up to 9x9 are written one character per cell or inequality, e.g.
+0-0<0---0<2-0<--0-0-0
+Any board, and every board bigger than 9x9, can also be written with the same
+tokens separated by commas, e.g. 0,-,0,<,0,-,-,-,0,<,2,-,0,<,-,-,0,-,0,-,0
+Cells past the 9th column are named A10, A11, ... and rows go up to Z.
+
+The solver itself works on cell numbers: cell row * n + col is named
+board.cells[cell], its value is board.values[cell] and its domain is
+board.domains[cell]. board.config is rebuilt from these on access.
+
 """
-import sys
+import argparse
 
 #======================================================================#
 #*#*#*# Optional: Import any allowed libraries you may need here #*#*#*#
 #======================================================================#
 import time
+import math
+import itertools
+import collections
+import multiprocessing
 import numpy as np
 #=================================#
 #*#*#*# Your code ends here #*#*#*#
 #=================================#
 
-ROW = "ABCDEFGHI"
-COL = "123456789"
+ROW = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+COL = [str(col) for col in range(1, len(ROW) + 1)]
+DELIMITER = ','  # between the tokens of a delimited configuration string
+# number of set bits of a domain mask (int.bit_count needs python 3.10)
+popcount = getattr(int, 'bit_count', lambda mask: bin(mask).count('1'))
+FLIP = {'<': '>', '>': '<', '-': '-'}  # the same inequality read from the other cell
+_GRIDS = {}  # n -> tables that only depend on the size of the board, see grid_tables()
+
+
+def board_dim(length):
+    '''
+    Returns the side n of the board written with length tokens: n*n cells and 2n(n-1) inequalities
+    '''
+    n = (1 + math.isqrt(1 + 3 * length)) // 3
+    if n < 1 or 3 * n * n - 2 * n != length:
+        raise Exception("Invalid configuration string length %d: a board of side n has 3n*n-2n tokens" % length)
+    return n
+
+
+def tokenize(config_string):
+    '''
+    Returns the tokens of a configuration string and its delimiter: comma separated, or one character each
+    '''
+    if DELIMITER in config_string:
+        return [token.strip() for token in config_string.split(DELIMITER)], DELIMITER
+    return list(config_string), ''
+
+
+def parse_config(config_string):
+    '''
+    Parses a configuration string in a single pass over its tokens.
+    Returns n, the tokens, the values of the cells (0 for empty) and, for every cell, the sign between it
+    and its right neighbour and between it and the cell below ('-' when there is none).
+    Raises an Exception naming the problem: bad length, bad symbol or a clue bigger than n
+    '''
+    tokens, delimiter = tokenize(config_string)
+    n = board_dim(len(tokens))
+    if n > len(ROW):
+        raise Exception("Board too big")
+    if n > 9 and not delimiter:
+        raise Exception("Boards bigger than 9x9 need a comma separated configuration string")
+
+    values = []
+    right = ['-'] * (n * n)
+    down = ['-'] * (n * n)
+    index = 0
+    for row in range(n):
+        for col in range(n):
+            token = tokens[index]
+            if not (token.isascii() and token.isdigit()):
+                raise Exception("Invalid symbol %r at position %d: cell %s%s takes a number" % (
+                    token, index, ROW[row], COL[col]))
+            value = int(token)
+            if value > n:
+                raise Exception("Clue %d at %s%s is bigger than the board size %d" % (value, ROW[row], COL[col], n))
+            values.append(value)
+            index += 1
+            if col < n - 1:
+                sign = tokens[index]
+                if sign not in FLIP:
+                    raise Exception("Invalid symbol %r at position %d: expected '<', '>' or '-' after %s%s" % (
+                        sign, index, ROW[row], COL[col]))
+                right[row * n + col] = sign
+                index += 1
+        if row < n - 1:
+            for col in range(n):
+                sign = tokens[index]
+                if sign not in FLIP:
+                    raise Exception("Invalid symbol %r at position %d: expected '<', '>' or '-' below %s%s" % (
+                        sign, index, ROW[row], COL[col]))
+                down[row * n + col] = sign
+                index += 1
+    return n, tokens, values, right, down
+
+
+def render_tokens(n, values, right, down):
+    '''
+    Inverse of parse_config(): the tokens of a board given its values and signs
+    '''
+    tokens = []
+    for row in range(n):
+        for col in range(n):
+            var = row * n + col
+            tokens.append(str(values[var]))
+            if col < n - 1:
+                tokens.append(right[var])
+        if row < n - 1:
+            tokens.extend(down[row * n:(row + 1) * n])
+    return tokens
+
+
+def grid_tables(n):
+    '''
+    Returns the tables shared by every board of side n: the cell names, the index of every cell among the
+    tokens, the row/column peers of every cell and the units (rows then columns)
+    '''
+    if n not in _GRIDS:
+        cells = [ROW[row] + COL[col] for row in range(n) for col in range(n)]
+        positions = [row * (3 * n - 1) + 2 * col for row in range(n) for col in range(n)]
+        peers = [tuple([row * n + i for i in range(n) if i != col] + [i * n + col for i in range(n) if i != row])
+                 for row in range(n) for col in range(n)]
+        units = [[row * n + col for col in range(n)] for row in range(n)] + \
+                [[row * n + col for row in range(n)] for col in range(n)]
+        _GRIDS[n] = (cells, positions, peers, units)
+    return _GRIDS[n]
+
 
 class Board:
     '''
@@ -43,12 +161,7 @@ class Board:
         '''
         Returns the side length of the board given a particular input string length
         '''
-        d = 4 + 12 * str_len
-        n = (2+np.sqrt(4+12*str_len))/6
-        if(int(n) != n):
-            raise Exception("Invalid configuration string length")
-        
-        return int(n)
+        return board_dim(str_len)
         
     def get_config_str(self):
         '''
@@ -77,40 +190,73 @@ class Board:
         Parses an input configuration string, retuns a dictionary to represent the board configuration
         as described above
         '''
+        n, _, values, right, down = parse_config(config_string)
+        return self.make_config_dict(n, values, right, down)
+
+    def make_config_dict(self, n, values, right, down):
+        # the dictionary described at the top of the file
         config_dict = {}
-        
-        for i in range(0, self.n):
-            for j in range(0, self.n):
-                cur = config_string[0]
-                config_string = config_string[1:]
-                
-                config_dict[ROW[i] + COL[j]] = int(cur)
-                
-                if(j != self.n - 1):
-                    cur = config_string[0]
-                    config_string = config_string[1:]
-                    config_dict[ROW[i] + COL[j] + '*'] = cur
-                    
-            if(i != self.n - 1):
-                for j in range(0, self.n):
-                    cur = config_string[0]
-                    config_string = config_string[1:]
-                    config_dict[ROW[i] + '*' + COL[j]] = cur
-                    
+        for row in range(n):
+            for col in range(n):
+                var = row * n + col
+                config_dict[ROW[row] + COL[col]] = values[var]
+                if col < n - 1:
+                    config_dict[ROW[row] + COL[col] + '*'] = right[var]
+                if row < n - 1:
+                    config_dict[ROW[row] + '*' + COL[col]] = down[var]
         return config_dict
-        
+
+    def build_index(self, values, right, down):
+        '''
+        Numbers the cells 0..n*n-1 (cell = row * n + col) and precomputes the tables read by the solver:
+        the value of every cell, the row/column peers of every cell and its inequality arcs.
+        right[var] and down[var] are the signs between var and its right and lower neighbours
+        '''
+        n = self.n
+        # cell names, index of every cell among the tokens of config_str, row/column peers, rows then columns
+        self.cells, self.positions, self.peers, self.units = grid_tables(n)
+        self.values = values  # 0 while the cell is unassigned
+        self.right = right
+        self.down = down
+
+        self.arcs = []  # (neighbour, sign) pairs, sign is '<' when this cell must be less than the neighbour
+        for var in range(n * n):
+            row, col = divmod(var, n)
+            arcs = []
+            if col < n - 1 and right[var] != '-':  # right neighbour
+                arcs.append((var + 1, right[var]))
+            if col > 0 and right[var - 1] != '-':  # left neighbour
+                arcs.append((var - 1, FLIP[right[var - 1]]))
+            if row < n - 1 and down[var] != '-':  # down neighbour
+                arcs.append((var + n, down[var]))
+            if row > 0 and down[var - n] != '-':  # up neighbour
+                arcs.append((var - n, FLIP[down[var - n]]))
+            self.arcs.append(tuple(arcs))
+
+        # every inequality once, as (smaller cell, bigger cell)
+        self.less_pairs = [(var, other_var) for var in range(n * n) for other_var, sign in self.arcs[var] if sign == '<']
+
+    @property
+    def config(self):
+        '''
+        Compatibility view: the configuration dictionary described at the top of the file,
+        built from self.values and the signs
+        '''
+        return self.make_config_dict(self.n, self.values, self.right, self.down)
+
     def print_board(self):
         '''
         Prints the current board to stdout
         '''
         config_dict = self.config
+        width = len(str(self.n))  # cells are right aligned on this width
         for i in range(0, self.n):
             for j in range(0, self.n):
                 cur = config_dict[ROW[i] + COL[j]]
                 if(cur == 0):
-                    print('_', end=' ')
+                    print('_'.rjust(width), end=' ')
                 else:
-                    print(str(cur), end=' ')
+                    print(str(cur).rjust(width), end=' ')
                 
                 if(j != self.n - 1):
                     cur = config_dict[ROW[i] + COL[j] + '*']
@@ -123,9 +269,9 @@ class Board:
                 for j in range(0, self.n):
                     cur = config_dict[ROW[i] + '*' + COL[j]]
                     if(cur == '-'):
-                        print(' ', end='   ')
+                        print(' '.rjust(width), end='   ')
                     else:
-                        print(cur, end='   ')
+                        print(cur.rjust(width), end='   ')
             print('')
     
     def __init__(self, config_string):
@@ -133,14 +279,58 @@ class Board:
         Initialising the board
         '''
         self.config_str = config_string
-        self.n = self.get_board_dim(len(config_string))
-        if(self.n > 9):
-            raise Exception("Board too big")
-            
-        self.config = self.convert_string_to_dict(config_string)
+        # one token per cell or inequality: single characters, or comma separated for big boards
+        self.delimiter = DELIMITER if DELIMITER in config_string else ''
+        self.n, tokens, values, right, down = parse_config(config_string)
+        self.setup(tokens, values, right, down)
+
+    @classmethod
+    def from_cells(cls, n, values, right, down):
+        '''
+        Board of already parsed cells and signs (see parse_config()), e.g. the records of a binary corpus.
+        The configuration string is rendered instead of parsed, only the clues are checked
+        '''
+        if max(values) > n:
+            var = next(var for var, value in enumerate(values) if value > n)
+            raise Exception("Clue %d at %s%s is bigger than the board size %d" % (values[var], ROW[var // n],
+                                                                                 COL[var % n], n))
+        board = cls.__new__(cls)
+        board.n = n
+        board.delimiter = DELIMITER if n > 9 else ''
+        tokens = render_tokens(n, values, right, down)
+        board.config_str = board.delimiter.join(tokens)
+        board.setup(tokens, values, right, down)
+        return board
+
+    def setup(self, tokens, values, right, down):
+        # shared end of the constructors
+        self.tokens = tokens  # patched by create_solved_board()
+        self.build_index(values, right, down)
+        self.load_values(self.values)
+        self.propagation = 'fc'  # see PROPAGATIONS, set by solve_board()
+        self.heuristic = 'mrv'  # see HEURISTICS, set by solve_board()
+        self.nodes = 0  # values tried by backtracking()
+        self.stats = None  # SearchStats of the running search, see solve_board_with_stats()
+        self.status = None  # one of STATUSES once solved
+        self.phase = None  # values tried first by the search, see order_values()
+        self.rng = None  # random.Random breaking the ties of the variable and value orders, see random_smallest()
+
+    def load_values(self, values):
+        '''
+        Starts the board over from the clues in values (0 for an empty cell), keeping the tables of
+        build_index(): resets the domains, clips them along the inequality chains and forward checks the clues
+        '''
+        self.values = list(values)
         self.domains = self.reset_domains()
+        self.trail = []  # (var, previous domain) for every domain change, see undo()
+        self.buckets = None  # DomainBuckets of the running search, see solve_board()
         
-        self.forward_checking(self.get_variables()) # do the first forward checking on every variables
+        # reason why the board has no solution when it is already known here, see solve_board()
+        self.contradiction = self.tighten_chains()
+        if self.contradiction is None:
+            if self.forward_checking(range(self.n * self.n)) is None: # do the first forward checking on every variables
+                self.contradiction = "the clues break a row, column or inequality constraint"
+        self.trail = []  # the initial pruning is never undone
         
         
     def __str__(self):
@@ -149,13 +339,14 @@ class Board:
         '''
         output = ''
         config_dict = self.config
+        width = len(str(self.n))
         for i in range(0, self.n):
             for j in range(0, self.n):
                 cur = config_dict[ROW[i] + COL[j]]
                 if(cur == 0):
-                    output += '_ '
+                    output += '_'.rjust(width) + ' '
                 else:
-                    output += str(cur)+ ' '
+                    output += str(cur).rjust(width) + ' '
                 
                 if(j != self.n - 1):
                     cur = config_dict[ROW[i] + COL[j] + '*']
@@ -168,9 +359,9 @@ class Board:
                 for j in range(0, self.n):
                     cur = config_dict[ROW[i] + '*' + COL[j]]
                     if(cur == '-'):
-                        output += '    '
+                        output += ' '.rjust(width) + '   '
                     else:
-                        output += cur + '   '
+                        output += cur.rjust(width) + '   '
             output += '\n'
         return output
         
@@ -178,13 +369,12 @@ class Board:
         '''
         Resets the domains of the board assuming no enforcement of constraints
         '''
-        domains = {}
-        variables = self.get_variables()
-        for var in variables:
-            if(self.config[var] == 0):
-                domains[var] = [i for i in range(1,self.n+1)]
+        domains = []
+        for value in self.values:
+            if(value == 0):
+                domains.append([i for i in range(1,self.n+1)])
             else:
-                domains[var] = [self.config[var]]
+                domains.append([value])
                 
         self.domains = domains
                 
@@ -201,96 +391,37 @@ class Board:
         # print("before reduce")
         # print(self.domains)
 
+        values = self.values
+        domains = self.domains
         for var in reassigned_variables:
-            assigned_value = self.config[var]  # Get the assigned value of the reassigned variable
+            assigned_value = values[var]  # Get the assigned value of the reassigned variable
             if assigned_value == 0:
                 continue    # if this variable is not assigned, don't reduce it
             # reduce others domain if var is assigned
-            # Get the row and column of the variable
-            row = ROW.index(var[0])
-            col = COL.index(var[1])
-            
-            # Forward check all variables in the same row
-            for i in range(self.n):
-                other_var = ROW[row] + COL[i]
-                if other_var != var and assigned_value in self.domains[other_var]:
-                    self.domains[other_var].remove(assigned_value)
-            
-            # Forward check all variables in the same column
-            for i in range(self.n):
-                other_var = ROW[i] + COL[col]
-                if other_var != var and assigned_value in self.domains[other_var]:
-                    self.domains[other_var].remove(assigned_value)
+            # Forward check all variables in the same row and column
+            for other_var in self.peers[var]:
+                if assigned_value in domains[other_var]:
+                    if not self.restrict(other_var, [num for num in domains[other_var] if num != assigned_value]):
+                        return None
             
             # INEQUALITIES
-            # reduce for inequalities. column inequalities. A1*
-            if col < self.n - 1:  # Right neighbor
-                ineq = ROW[row] + COL[col] + '*'
-                right_var = ROW[row] + COL[col + 1]
-                if ineq in self.config and self.config[ineq] == '<':    # var < right
-                    # right_var should be greater than assigned_value
-                    if self.config[right_var] != 0:  # If next var is assigned
-                        if assigned_value >= self.config[right_var]:
-                            return None
-                    self.domains[right_var] = [num for num in self.domains[right_var] if num > assigned_value]
-                elif ineq in self.config and self.config[ineq] == '>':  # var > right
-                    # right_var should be smaller than assigned_Value
-                    if self.config[right_var] != 0:  # If next var is assigned
-                        if assigned_value <= self.config[right_var]:
-                            return None
-                    self.domains[right_var] = [num for num in self.domains[right_var] if num < assigned_value]
-                    
-            if col > 0:  # Left neighbor
-                ineq = ROW[row] + COL[col - 1] + '*'    # ineq on the left neighbor
-                left_var = ROW[row] + COL[col - 1]
-                if ineq in self.config and self.config[ineq] == '<':    # left < var
-                    # left_var should be smaller than assigned_value
-                    if self.config[left_var] != 0:  # If next var is assigned
-                        if self.config[left_var] >= assigned_value:
-                            return None
-                    self.domains[left_var] = [num for num in self.domains[left_var] if num < assigned_value]
-                elif ineq in self.config and self.config[ineq] == '>':  # left > var
-                    # left_var should be greater than assigned_value
-                    if self.config[left_var] != 0:  # If next var is assigned
-                        if self.config[left_var] <= assigned_value:
-                            return None
-                    self.domains[left_var] = [num for num in self.domains[left_var] if num > assigned_value]
-            # reduce for inequalities. row inequalities. A*1
-            if row < self.n - 1:  # Down neighbor
-                ineq = ROW[row] + '*' + COL[col]    # ineq on var
-                down_var = ROW[row + 1] + COL[col]
-                if ineq in self.config and self.config[ineq] == '<':    # var < down_var
-                    if self.config[down_var] != 0:  # If next var is assigned
-                        if assigned_value >= self.config[down_var]:
-                            return None
-                    self.domains[down_var] = [num for num in self.domains[down_var] if num > assigned_value]
-                    
-                elif ineq in self.config and self.config[ineq] == '>':  # var > down_var
-                    if self.config[down_var] != 0:  # If next var is assigned
-                        if assigned_value <= self.config[down_var]:
-                            return None
-                    self.domains[down_var] = [num for num in self.domains[down_var] if num < assigned_value]
-                    
-            if row > 0:  # Up neighbor
-                ineq = ROW[row - 1] + '*' + COL[col]    # ineq on up_var
-                up_var = ROW[row - 1] + COL[col]
-                if ineq in self.config and self.config[ineq] == '<':    # up_var < var
-                    if self.config[up_var] != 0:  # If next var is assigned
-                        if self.config[up_var] >= assigned_value:
-                            return None
-                    self.domains[up_var] = [num for num in self.domains[up_var] if num < assigned_value]
-                elif ineq in self.config and self.config[ineq] == '>':  # up_var > var
-                    if self.config[up_var] != 0:  # If next var is assigned
-                        if self.config[up_var] <= assigned_value:
-                            return None
-                    self.domains[up_var] = [num for num in self.domains[up_var] if num > assigned_value]
+            for other_var, sign in self.arcs[var]:
+                if sign == '<':    # var < other_var
+                    # other_var should be greater than assigned_value
+                    if values[other_var] != 0 and values[other_var] <= assigned_value:
+                        return None
+                    if not self.restrict(other_var, [num for num in domains[other_var] if num > assigned_value]):
+                        return None
+                else:   # var > other_var
+                    # other_var should be smaller than assigned_value
+                    if values[other_var] != 0 and values[other_var] >= assigned_value:
+                        return None
+                    if not self.restrict(other_var, [num for num in domains[other_var] if num < assigned_value]):
+                        return None
 
         # print("after reduce")
         # print(self.domains)
-        # edge case
-        if any(len(self.domains[var]) < 1 for var in self.domains):
-            # print("return None for ", var)
-            return None
+        # an emptied domain already returned None in restrict()
         return self  # Return the board if forward checking succeeded
         #=================================#
 		#*#*#*# Your code ends here #*#*#*#
@@ -299,47 +430,158 @@ class Board:
     #=================================================================================#
 	#*#*#*# Optional: Write any other functions you may need in the Board Class #*#*#*#
 	#=================================================================================#
+    def domain_values(self, var):
+        # values still in the domain of var, smallest first
+        return list(self.domains[var])
+
+    def domain_size(self, var):
+        return len(self.domains[var])
+
+    def count_values(self, domain):
+        # size of a domain that may not be installed, e.g. one saved on the trail
+        return len(domain)
+
+    def restrict(self, var, new_domain):
+        # replace the domain of var, keeping the old one on the trail so undo() can put it back
+        # returns False if the new domain is empty
+        if len(new_domain) != len(self.domains[var]):
+            self.trail.append((var, self.domains[var]))
+            self.domains[var] = new_domain
+        return len(new_domain) > 0
+
+    def domain_min(self, var):
+        return self.domains[var][0]
+
+    def domain_max(self, var):
+        return self.domains[var][-1]
+
+    def has_value(self, var, value):
+        return value in self.domains[var]
+
+    def keep_range(self, var, low, high):
+        # restrict the domain of var to low..high
+        domain = self.domains[var]
+        if domain[0] >= low and domain[-1] <= high:
+            return True
+        return self.restrict(var, [num for num in domain if low <= num <= high])
+
+    def keep_value(self, var, value):
+        if value not in self.domains[var]:
+            return self.restrict(var, [])
+        return self.restrict(var, [value])
+
+    def remove_value(self, var, value):
+        if value not in self.domains[var]:
+            return True
+        return self.restrict(var, [num for num in self.domains[var] if num != value])
+
+    def mark(self):
+        # current position of the trail
+        return len(self.trail)
+
+    def undo(self, mark):
+        # restore every domain changed since mark, latest change first
+        trail = self.trail
+        domains = self.domains
+        buckets = self.buckets
+        if buckets is None:
+            while len(trail) > mark:
+                var, old_domain = trail.pop()
+                domains[var] = old_domain
+            return
+        while len(trail) > mark:
+            var, old_domain = trail.pop()
+            domains[var] = old_domain
+            buckets.resize(var, self.count_values(old_domain))
+        buckets.synced = min(buckets.synced, mark)
+
+    def take_variable(self):
+        # unassigned variable with the smallest domain from the buckets, which it leaves until release_variable()
+        buckets = self.buckets
+        trail = self.trail
+        # domains narrowed since the last call, the trail holds every one of them
+        for index in range(buckets.synced, len(trail)):
+            var = trail[index][0]
+            buckets.resize(var, self.domain_size(var))
+        buckets.synced = len(trail)
+        var = buckets.smallest()
+        if var is not None:
+            buckets.remove(var)
+        return var
+
+    def release_variable(self, var):
+        # var is unassigned again after all its values failed
+        if self.buckets is not None:
+            self.buckets.insert(var)
+
+    def order_values(self, var):
+        '''
+        Values of var in the order the search tries them: smallest first or, with the 'lcv' heuristic,
+        the ones that remove the fewest values from the domains of the unassigned neighbours first.
+        With self.phase, the values of an earlier solution, the value var had there comes before all.
+        With self.rng, the values are shuffled instead of smallest first
+        '''
+        domain_values = self.domain_values(var)
+        if self.heuristic == 'lcv' and len(domain_values) > 1:
+            domain_values = self.least_constraining(var, domain_values)
+        elif self.rng is not None:
+            self.rng.shuffle(domain_values)
+        if self.phase is not None and self.phase[var] in domain_values:
+            domain_values.remove(self.phase[var])
+            domain_values.insert(0, self.phase[var])
+        return domain_values
+
+    def least_constraining(self, var, domain_values):
+        # domain_values sorted by the number of values they remove from the unassigned neighbours
+        values = self.values
+        peers = [other_var for other_var in self.peers[var] if values[other_var] == 0]
+        arcs = [(sign, self.domain_values(other_var)) for other_var, sign in self.arcs[var] if values[other_var] == 0]
+
+        def removed(value):
+            count = sum(1 for other_var in peers if self.has_value(other_var, value))
+            for sign, domain in arcs:
+                if sign == '<':  # other_var loses every value up to value
+                    count += sum(1 for num in domain if num <= value)
+                else:
+                    count += sum(1 for num in domain if num >= value)
+            return count
+
+        return sorted(domain_values, key=removed)  # stable, smallest value first on ties
+
     def select_unassigned_variable(self):
         # select unassigned variable with smallest domain
+        if self.buckets is not None:
+            return self.take_variable()
 
         # select unassigned var
-        unassigned_vars = [var for var in self.domains if (self.config[var] == 0)]
-        # Sort unassigned variables based on the size of their domains
-        unassigned_vars.sort(key=lambda var: len(self.domains[var]))
-        # Return the variable with the smallest domain
-        return unassigned_vars[0] if unassigned_vars else None  # Return None if no unassigned variable is found
-        return None
+        values = self.values
+        unassigned_vars = [var for var in range(len(values)) if values[var] == 0]
+        if not unassigned_vars:
+            return None  # Return None if no unassigned variable is found
+        if self.rng is not None:
+            return self.random_smallest(unassigned_vars)
+        # Return the variable with the smallest domain (the first one on ties)
+        return min(unassigned_vars, key=self.domain_size)
+
+    def random_smallest(self, unassigned_vars):
+        # one of the variables with the smallest domain, drawn by self.rng (randomized restarts, see portfolio.py)
+        sizes = [self.domain_size(var) for var in unassigned_vars]
+        smallest = min(sizes)
+        return self.rng.choice([var for var, size in zip(unassigned_vars, sizes) if size == smallest])
     
     def create_solved_board(self):
         # debug check
-        if any(len(board.domains[var]) != 1 for var in board.domains):
+        if any(self.domain_size(var) != 1 for var in range(len(self.domains))):
             print("some domain is not in size 1")
             exit(1)
             return
         # re-write config_str
-        # replace entries of numbers with board.config[var] assigned number. other symbols remains
-        new_config_str = ""
-        # Iterate through the original config_str to maintain non-number entries
-        index = 0  # To track position in the original config_str
-        for r in ROW[:self.n]:
-            for c in COL[:self.n]:
-                var = r + c
-                # Check if current character in config_str is a number (0 means unassigned)
-                if self.config[var] != 0:
-                    new_config_str += str(self.config[var])  # Assigned number
-                    index += 1
-                else:
-                    # Maintain original characters (0 or other symbols) from config_str
-                    new_config_str += self.config_str[index]
-                    index += 1
-                if c != COL[self.n - 1]:
-                    new_config_str += self.config_str[index]
-                    index += 1
-        
-            if r != ROW[self.n - 1]:
-                new_config_str += self.config_str[index : index + self.n]  # Add separators (or adjust based on your format)
-                index += self.n
-        self.config_str = new_config_str
+        # replace entries of numbers with the assigned values. other symbols remains
+        tokens = self.tokens
+        for var, value in enumerate(self.values):
+            if value != 0:
+                tokens[self.positions[var]] = str(value)
+        self.config_str = self.delimiter.join(tokens)
         return
     
     def is_complete(self):
@@ -348,12 +590,174 @@ class Board:
         # if all(len(board.domains[var]) == 1 for var in board.domains): check by domains will bring error :)?
         #     self.create_solved_board()
         #     return True
-        # check by config assignment
-        variables = self.get_variables()
-        if all(board.config[var] != 0 for var in variables):
-            board.create_solved_board()
+        # check by assignment
+        if 0 not in self.values:
+            self.create_solved_board()
             return True
         return False
+
+    def tighten_chains(self):
+        '''
+        Preprocessing on the directed graph of the inequalities (edge small -> big).
+        A cell with a chain of k smaller cells leading into it is at least k+1, and one with a chain of
+        k bigger cells leading out of it is at most n-k: every domain is clipped to these bounds.
+        Returns a description of the contradiction (cycle, chain longer than n, clue out of its bounds)
+        or None
+        '''
+        n = self.n
+        cells = n * n
+        bigger = [[] for _ in range(cells)]
+        smaller = [[] for _ in range(cells)]
+        for small, big in self.less_pairs:
+            bigger[small].append(big)
+            smaller[big].append(small)
+
+        # topological order (Kahn), cells left out of it are on a cycle
+        waiting = [len(smaller[var]) for var in range(cells)]
+        order = [var for var in range(cells) if waiting[var] == 0]
+        for var in order:
+            for big in bigger[var]:
+                waiting[big] -= 1
+                if waiting[big] == 0:
+                    order.append(big)
+        if len(order) < cells:
+            cycle = [self.cells[var] for var in range(cells) if waiting[var] > 0]
+            return "cycle of inequalities through " + ", ".join(cycle)
+
+        # longest chain into (below) and out of (above) every cell
+        below = [0] * cells
+        for var in order:
+            for big in bigger[var]:
+                below[big] = max(below[big], below[var] + 1)
+        above = [0] * cells
+        for var in reversed(order):
+            for small in smaller[var]:
+                above[small] = max(above[small], above[var] + 1)
+
+        for var in range(cells):
+            if below[var] + above[var] + 1 > n:
+                return "chain of %d inequalities through %s on a board of size %d" % (
+                    below[var] + above[var], self.cells[var], n)
+            if not self.keep_range(var, below[var] + 1, n - above[var]):
+                return "clue %s=%d is outside %d..%d allowed by its inequalities" % (
+                    self.cells[var], self.values[var], below[var] + 1, n - above[var])
+        return None
+
+    def propagate(self, reassigned_variables):
+        '''
+        Forward checking followed, unless self.propagation is 'fc', by a fixpoint of:
+        bounds consistency on every inequality, naked and hidden singles in every row and column
+        and, for 'alldiff', matching based all-different filtering.
+        Returns None if some domain is wiped out
+        '''
+        if self.forward_checking(reassigned_variables) is None:
+            return None
+        if self.propagation == 'fc':
+            return self
+
+        n = self.n
+        trail = self.trail
+        # an assigned cell keeps only its value, so the rules below can read the domains alone
+        for var in reassigned_variables:
+            if self.values[var] != 0 and not self.keep_value(var, self.values[var]):
+                return None
+
+        while True:
+            before = len(trail)
+
+            # bounds consistency on small < big
+            for small, big in self.less_pairs:
+                if not self.keep_range(big, self.domain_min(small) + 1, n):
+                    return None
+                if not self.keep_range(small, 1, self.domain_max(big) - 1):
+                    return None
+
+            # naked singles
+            for var in range(n * n):
+                if self.domain_size(var) == 1:
+                    value = self.domain_min(var)
+                    for other_var in self.peers[var]:
+                        if not self.remove_value(other_var, value):
+                            return None
+
+            for unit in self.units:
+                # hidden singles
+                for value in range(1, n + 1):
+                    holders = [var for var in unit if self.has_value(var, value)]
+                    if not holders:
+                        return None
+                    if len(holders) == 1 and not self.keep_value(holders[0], value):
+                        return None
+                if self.propagation == 'alldiff' and not self.filter_all_different(unit):
+                    return None
+
+            if len(trail) == before:  # fixpoint
+                return self
+
+    def filter_all_different(self, unit):
+        '''
+        Regin's filtering for one row or column: removes every value that belongs to no perfect
+        matching between the cells of the unit and the values 1..n.
+        Returns False if there is no such matching
+        '''
+        n = self.n
+        domains = [self.domain_values(var) for var in unit]
+        cell_of = {}  # value -> position in unit of the cell matched to it
+        value_of = [0] * n
+
+        def augment(pos, seen):
+            for value in domains[pos]:
+                if value not in seen:
+                    seen.add(value)
+                    if value not in cell_of or augment(cell_of[value], seen):
+                        cell_of[value] = pos
+                        value_of[pos] = value
+                        return True
+            return False
+
+        for pos in range(n):
+            if not augment(pos, set()):
+                return False
+
+        # strongly connected components of the graph cell -> value (free edges), value -> cell (matched edges).
+        # nodes 0..n-1 are the cells, n..2n-1 the values 1..n
+        edges = [[n + value - 1 for value in domains[pos] if value != value_of[pos]] for pos in range(n)] + \
+                [[cell_of[value]] for value in range(1, n + 1)]
+        component = [-1] * (2 * n)
+        low = [0] * (2 * n)
+        order = [-1] * (2 * n)
+        stack = []
+        counter = [0, 0]  # next order, next component
+
+        def strong_connect(node):
+            order[node] = low[node] = counter[0]
+            counter[0] += 1
+            stack.append(node)
+            for succ in edges[node]:
+                if order[succ] == -1:
+                    strong_connect(succ)
+                    low[node] = min(low[node], low[succ])
+                elif component[succ] == -1:
+                    low[node] = min(low[node], order[succ])
+            if low[node] == order[node]:
+                while True:
+                    member = stack.pop()
+                    component[member] = counter[1]
+                    if member == node:
+                        break
+                counter[1] += 1
+
+        for node in range(2 * n):
+            if order[node] == -1:
+                strong_connect(node)
+
+        # every value is matched, so a free edge is consistent only inside a component
+        for pos, var in enumerate(unit):
+            for value in domains[pos]:
+                if value != value_of[pos] and component[pos] != component[n + value - 1]:
+                    if not self.remove_value(var, value):
+                        return False
+        return True
     #=================================#
 	#*#*#*# Your code ends here #*#*#*#
 	#=================================#
@@ -362,11 +766,231 @@ class Board:
 #*#*#*# Optional: You may write helper functions in this space if required #*#*#*#
 #================================================================================#        
 
+class BitsetBoard(Board):
+    '''
+    Board whose domains are integer bitmasks instead of lists.
+    Bit v of self.domains[var] is set while the value v is still possible for var
+    '''
+
+    def reset_domains(self):
+        '''
+        Resets the domains of the board assuming no enforcement of constraints
+        '''
+        full = (1 << (self.n + 1)) - 2  # bits 1..n
+        domains = []
+        for value in self.values:
+            if(value == 0):
+                domains.append(full)
+            else:
+                domains.append(1 << value)
+
+        self.domains = domains
+
+        return domains
+
+    def domain_values(self, var):
+        mask = self.domains[var]
+        return [v for v in range(1, self.n + 1) if mask >> v & 1]
+
+    def domain_size(self, var):
+        return popcount(self.domains[var])
+
+    def count_values(self, domain):
+        return popcount(domain)
+
+    def domain_min(self, var):
+        mask = self.domains[var]
+        return (mask & -mask).bit_length() - 1
+
+    def domain_max(self, var):
+        return self.domains[var].bit_length() - 1
+
+    def has_value(self, var, value):
+        return self.domains[var] >> value & 1
+
+    def restrict(self, var, allowed):
+        # AND the domain of var with the mask allowed, see Board.restrict()
+        mask = self.domains[var]
+        if mask & ~allowed:
+            self.trail.append((var, mask))
+            mask &= allowed
+            self.domains[var] = mask
+        return mask != 0
+
+    def keep_range(self, var, low, high):
+        return self.restrict(var, ((1 << (high + 1)) - 1) & ~((1 << low) - 1))
+
+    def keep_value(self, var, value):
+        return self.restrict(var, 1 << value)
+
+    def remove_value(self, var, value):
+        return self.restrict(var, ~(1 << value))
+
+    def select_unassigned_variable(self):
+        # MRV on the popcount of the masks
+        if self.buckets is not None:
+            return self.take_variable()
+        values = self.values
+        domains = self.domains
+        unassigned_vars = [var for var in range(len(values)) if values[var] == 0]
+        if not unassigned_vars:
+            return None
+        if self.rng is not None:
+            return self.random_smallest(unassigned_vars)
+        return min(unassigned_vars, key=lambda var: popcount(domains[var]))
+
+    def forward_checking(self, reassigned_variables):
+        '''
+        Same pruning as Board.forward_checking, done with mask ANDs
+        '''
+        values = self.values
+        domains = self.domains
+        trail = self.trail
+        for var in reassigned_variables:
+            assigned_value = values[var]
+            if assigned_value == 0:
+                continue
+            bit = 1 << assigned_value
+            others = ~bit
+            below = bit - 1  # values < assigned_value (bit 0 is never set)
+            above = ~((bit << 1) - 1)  # values > assigned_value
+
+            # remove the value from the row and the column
+            for other_var in self.peers[var]:
+                mask = domains[other_var]
+                if mask & bit:
+                    trail.append((other_var, mask))
+                    mask &= others
+                    if not mask:
+                        return None
+                    domains[other_var] = mask
+
+            for other_var, sign in self.arcs[var]:
+                if sign == '<':  # var < other_var
+                    if values[other_var] != 0 and values[other_var] <= assigned_value:
+                        return None
+                    allowed = above
+                else:  # var > other_var
+                    if values[other_var] != 0 and values[other_var] >= assigned_value:
+                        return None
+                    allowed = below
+                mask = domains[other_var]
+                if mask & ~allowed:
+                    trail.append((other_var, mask))
+                    mask &= allowed
+                    if not mask:
+                        return None
+                    domains[other_var] = mask
+
+        return self
+
+
+
+class DomainBuckets:
+    '''
+    Unassigned cells grouped by domain size, so the MRV choice does not scan the board.
+    The board keeps the sizes up to date from its trail: when a variable is selected and in undo().
+    With degree, ties go to the cell with the most inequality arcs and unassigned peers
+    '''
+
+    def __init__(self, board, degree=False):
+        n = board.n
+        cells = n * n
+        self.size = [board.domain_size(var) for var in range(cells)]
+        self.members = [[] for _ in range(n + 1)]  # domain size -> cells, in no particular order
+        self.where = [-1] * cells  # index of a cell in its bucket, -1 when it is not in one
+        self.synced = len(board.trail)  # trail entries already applied to the sizes
+        self.peers = board.peers
+        self.degree = None
+        if degree:
+            # arcs here, every insert() below adds one to the peers of the inserted cell
+            self.degree = [len(board.arcs[var]) for var in range(cells)]
+        for var in range(cells):
+            if board.values[var] == 0:
+                self.insert(var)
+
+    def insert(self, var):
+        bucket = self.members[self.size[var]]
+        self.where[var] = len(bucket)
+        bucket.append(var)
+        if self.degree is not None:
+            for other_var in self.peers[var]:
+                self.degree[other_var] += 1
+
+    def remove(self, var):
+        # swap with the last cell of the bucket, O(1)
+        bucket = self.members[self.size[var]]
+        index = self.where[var]
+        last = bucket.pop()
+        if last != var:
+            bucket[index] = last
+            self.where[last] = index
+        self.where[var] = -1
+        if self.degree is not None:
+            for other_var in self.peers[var]:
+                self.degree[other_var] -= 1
+
+    def resize(self, var, size):
+        if self.size[var] == size:
+            return
+        if self.where[var] < 0:  # assigned, only the size is tracked
+            self.size[var] = size
+            return
+        bucket = self.members[self.size[var]]
+        index = self.where[var]
+        last = bucket.pop()
+        if last != var:
+            bucket[index] = last
+            self.where[last] = index
+        self.size[var] = size
+        bucket = self.members[size]
+        self.where[var] = len(bucket)
+        bucket.append(var)
+
+    def smallest(self):
+        # a cell of the first non-empty bucket, None when every cell is assigned
+        for bucket in self.members:
+            if bucket:
+                if self.degree is None:
+                    return bucket[-1]
+                return max(bucket, key=self.degree.__getitem__)
+        return None
+
+
+# propagation run after every assignment, selectable with --propagation
+PROPAGATIONS = (
+    'fc',  # forward checking only
+    'gac',  # + inequality bounds, naked and hidden singles to a fixpoint
+    'alldiff',  # + matching based all-different filtering
+)
+
+# domain engines selectable with --engine
+ENGINES = {
+    'list': Board,
+    'bitset': BitsetBoard,
+}
+
+# variable and value ordering of the search, selectable with --heuristic
+HEURISTICS = (
+    'mrv',  # smallest domain, found by a scan of the cells
+    'buckets',  # smallest domain, from the cells bucketed by domain size (DomainBuckets)
+    'degree',  # + ties broken by inequality arcs and unassigned peers
+    'lcv',  # + least constraining value first
+)
+
+# search algorithm, selectable with --search
+SEARCHES = (
+    'backtracking',  # chronological, undo the last assignment (backtracking())
+    'backjump',  # conflict-directed backjumping to the deepest assignment in the conflict (BackjumpSearch)
+    'nogoods',  # + the conflicts learned as nogoods and checked before every assignment (NogoodStore)
+    'dlx',  # exact cover of the Latin square with dancing links, inequalities checked on every choice (dlx.py)
+)
+
 #=================================#
 #*#*#*# Your code ends here #*#*#*#
 #=================================#
 
-def backtracking(board):
+def backtracking(board, depth=0):
     '''
     Performs the backtracking algorithm to solve the board
     Returns only a solved board
@@ -374,6 +998,7 @@ def backtracking(board):
     #==========================================================#
 	#*#*#*# TODO: Write your backtracking algorithm here #*#*#*#
 	#==========================================================#
+    stats = board.stats  # SearchStats, None unless solve_board_with_stats() is used
     
     # is board complete (each variables is not 0), then return board
     if board.is_complete():
@@ -381,29 +1006,37 @@ def backtracking(board):
         return board
     
     # Select variable with smallest domain (MRV heuristic)
-    var = board.select_unassigned_variable()
+    if stats is None:
+        var = board.select_unassigned_variable()
+    else:
+        var = stats.select(board)
     # print(f"\nSelected variable: {var}")
     # print(f"Available values: {board.domains[var]}")
     
-    if not var:
+    if var is None:
         return None
     # Try each value in the domain
-    domain_values = list(board.domains[var])  # Make a copy of the domain values
+    domain_values = board.order_values(var)  # Make a copy of the domain values
+    if stats is not None:
+        stats.expand(depth, len(domain_values))
     # Try each value in the domain
     for value in domain_values:
         # print(f"\nTrying {var} = {value}")
-        # Create deep copies of current state
-        original_config = board.config.copy()
-        original_domains = {k: list(v) for k, v in board.domains.items()}  # Deep copy of domains
+        # Remember where the trail is, only the domains pruned from here are restored
+        mark = board.mark()
         
         # Assign value and check constraints
-        board.config[var] = value
-        result = board.forward_checking([var])
+        board.values[var] = value
+        board.nodes += 1
+        if stats is None:
+            result = board.propagate([var])
+        else:
+            result = stats.propagate(board, var, value, depth, mark)
         
         if result:  # Forward checking succeeded
             # print(f"Forward checking passed for {var} = {value}")
             # Recursive call
-            new_result = backtracking(board)
+            new_result = backtracking(board, depth + 1)
             if new_result:  # Solution found
                 return new_result
             # print(f"Backtracking from {var} = {value}")  # Debug backtracking
@@ -411,18 +1044,22 @@ def backtracking(board):
         #     print(f"Forward checking failed for {var} = {value}")
             
         # Restore state before trying next value
-        board.config = original_config
-        board.domains = original_domains
+        if stats is not None:
+            stats.backtrack(board, var, value, depth)
+        board.values[var] = 0
+        board.undo(mark)
     
     # print(f"No valid value found for {var}, backtracking...")
+    board.release_variable(var)
     return None
     #=================================#
 	#*#*#*# Your code ends here #*#*#*#
 	#=================================#
     
-def solve_board(board):
+def solve_board(board, propagation='fc', heuristic='mrv'):
     '''
     Runs the backtrack helper and times its performance.
+    propagation is one of PROPAGATIONS, heuristic one of HEURISTICS.
     Returns the solved board and the runtime
     '''
     #================================================================#
@@ -430,8 +1067,20 @@ def solve_board(board):
 	#================================================================#
     start_time = time.time()
     # board.domains = board.reset_domains()  # Initialize domains once
-    solved_board = backtracking(board)
+    board.propagation = propagation
+    board.heuristic = heuristic
+    solved_board = None
+    if board.contradiction is not None:  # found while building the board, no search needed
+        board.status = 'unsat'
+        return None, -1
+    # the constructor only did forward checking, stronger propagations start with a fixpoint of their own
+    if propagation == 'fc' or board.propagate(range(board.n * board.n)):
+        if heuristic != 'mrv':
+            board.buckets = DomainBuckets(board, degree=heuristic in ('degree', 'lcv'))
+        solved_board = backtracking(board)
+        board.buckets = None
     runtime = time.time() - start_time
+    board.status = 'solved' if solved_board else 'unsat'
 
     if solved_board:
         return solved_board, runtime
@@ -442,52 +1091,780 @@ def solve_board(board):
 	#*#*#*# Your code ends here #*#*#*#
 	#=================================#
 
-def print_stats(runtimes):
+# outcome of a search, in board.status
+STATUSES = (
+    'solved',
+    'unsat',  # the board has no solution
+    'timeout',  # the time or node budget ran out first
+    'cancelled',  # stopped from another thread
+)
+
+
+def iterative_backtracking(board, max_nodes=None, deadline=None, cancel=None):
+    '''
+    Same search as backtracking() on an explicit stack, so it can stop at any node.
+    Stops after max_nodes nodes, once time.monotonic() passes deadline or the threading.Event
+    cancel is set; with forward checking the clock and the event are only read every 64 nodes,
+    the nodes of the stronger propagations cost enough to read them every time.
+    Returns one of STATUSES. A stopped search leaves its partial assignment in board.values
+    '''
+    values = board.values
+    free = values.count(0)
+    last_node = None if max_nodes is None else board.nodes + max_nodes
+    stride = 63 if board.propagation == 'fc' else 0  # mask of board.nodes between two reads of the clock
+    if free == 0:
+        board.create_solved_board()
+        return 'solved'
+    var = board.select_unassigned_variable()
+    stack = [[var, board.order_values(var), 0, None]]  # variable, values to try, next one, mark of the tried one
+    while stack:
+        frame = stack[-1]
+        var, domain_values, index, mark = frame
+        if mark is not None:  # the previous value of var failed below
+            values[var] = 0
+            board.undo(mark)
+            frame[3] = None
+        if index == len(domain_values):
+            board.release_variable(var)
+            stack.pop()
+            continue
+
+        if last_node is not None and board.nodes >= last_node:
+            return 'timeout'
+        if board.nodes & stride == 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return 'timeout'
+            if cancel is not None and cancel.is_set():
+                return 'cancelled'
+
+        frame[2] = index + 1
+        frame[3] = board.mark()
+        values[var] = domain_values[index]
+        board.nodes += 1
+        if board.propagate([var]):
+            if len(stack) == free:  # every frame holds an assigned variable
+                board.create_solved_board()
+                return 'solved'
+            var = board.select_unassigned_variable()
+            stack.append([var, board.order_values(var), 0, None])
+    return 'unsat'
+
+
+def solve_board_iterative(board, propagation='fc', heuristic='mrv', timeout=None, max_nodes=None, cancel=None):
+    '''
+    solve_board() within a budget: at most timeout seconds and max_nodes search nodes (None for no limit),
+    stopping early when the threading.Event cancel is set by another thread.
+    Returns the status (one of STATUSES, also left in board.status), the board and the runtime.
+    The board is solved for 'solved' and holds the partial assignment reached for 'timeout' and 'cancelled'
+    '''
+    start_time = time.time()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    board.propagation = propagation
+    board.heuristic = heuristic
+    status = 'unsat'
+    if deadline is not None and time.monotonic() >= deadline:
+        status = 'timeout'
+    elif board.contradiction is None and (propagation == 'fc' or board.propagate(range(board.n * board.n))):
+        if heuristic != 'mrv':
+            board.buckets = DomainBuckets(board, degree=heuristic in ('degree', 'lcv'))
+        status = iterative_backtracking(board, max_nodes, deadline, cancel)
+        board.buckets = None
+    board.status = status
+    return status, board, time.time() - start_time
+
+
+def counting_backtracking(board, limit=None):
+    '''
+    Same search as backtracking() that keeps going after a solution.
+    Returns the number of solutions below the current state, at most limit (None for no limit).
+    The board is restored before returning
+    '''
+    if 0 not in board.values:  # complete, create_solved_board() is left to solve_board()
+        return 1
+
+    var = board.select_unassigned_variable()
+    found = 0
+    for value in board.order_values(var):
+        mark = board.mark()
+        board.values[var] = value
+        board.nodes += 1
+        if board.propagate([var]):
+            found += counting_backtracking(board, None if limit is None else limit - found)
+        board.values[var] = 0
+        board.undo(mark)
+        if limit is not None and found >= limit:
+            break
+    board.release_variable(var)
+    return found
+
+
+def count_solutions(board, limit=None, propagation='fc', heuristic='mrv'):
+    '''
+    Counts the solutions of the board with the same pruning and ordering as solve_board(), stopping at limit
+    (e.g. 2 to check that a puzzle has exactly one solution). The board is left as it was given.
+    Returns the number of solutions found and the search nodes used
+    '''
+    if board.contradiction is not None:
+        return 0, 0
+    board.propagation = propagation
+    board.heuristic = heuristic
+    nodes = board.nodes
+    mark = board.mark()
+    found = 0
+    if propagation == 'fc' or board.propagate(range(board.n * board.n)):
+        if heuristic != 'mrv':
+            board.buckets = DomainBuckets(board, degree=heuristic in ('degree', 'lcv'))
+        found = counting_backtracking(board, limit)
+        board.buckets = None
+    board.undo(mark)
+    return found, board.nodes - nodes
+
+
+def has_unique_solution(board, propagation='fc'):
+    return count_solutions(board, 2, propagation)[0] == 1
+
+
+class NogoodStore:
+    '''
+    Nogoods learned by BackjumpSearch: sets of (cell, value) assignments that no solution contains.
+    Only nogoods of at most max_size assignments are learned and at most capacity of them are kept,
+    the least recently used one is evicted first.
+    Each nogood is watched on one of its assignments that has not been made yet: assignments are undone
+    in the reverse order they were made, so a nogood can only become complete when that one is made
+    '''
+
+    def __init__(self, capacity=10000, max_size=8):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.nogoods = collections.OrderedDict()  # frozenset of (var, value) -> watched (var, value)
+        self.watches = {}  # (var, value) -> set of the nogoods watched on it
+        self.learned = 0
+        self.evicted = 0
+        self.hits = 0
+
+    def add(self, nogood, watched):
+        # watched is the assignment of nogood that is undone first
+        if len(nogood) > self.max_size or nogood in self.nogoods or self.capacity <= 0:
+            return
+        self.nogoods[nogood] = watched
+        self.watches.setdefault(watched, set()).add(nogood)
+        self.learned += 1
+        while len(self.nogoods) > self.capacity:
+            evicted, watched = self.nogoods.popitem(last=False)
+            self.evicted += 1
+            watchers = self.watches[watched]
+            watchers.discard(evicted)
+            if not watchers:
+                del self.watches[watched]
+
+    def violated(self, var, value, values):
+        '''
+        Returns a nogood that assigning value to var completes, given the other values, or None.
+        The nogoods watched on (var, value) that still miss an assignment are watched on it instead
+        '''
+        watchers = self.watches.get((var, value))
+        if not watchers:
+            return None
+        for nogood in list(watchers):
+            complete = True
+            for literal in nogood:
+                if values[literal[0]] == 0:
+                    # move the watch to an assignment still to be made
+                    watchers.discard(nogood)
+                    self.watches.setdefault(literal, set()).add(nogood)
+                    self.nogoods[nogood] = literal
+                    complete = False
+                    break
+                if values[literal[0]] != literal[1]:
+                    complete = False  # made with another value, stays watched here
+            if complete:
+                self.hits += 1
+                self.nogoods.move_to_end(nogood)
+                return nogood
+        if not watchers:
+            del self.watches[(var, value)]
+        return None
+
+
+class BackjumpSearch:
+    '''
+    Conflict-directed backjumping with forward checking (FC-CBJ).
+    Every assignment gets a depth (1 for the first one) and a conflict set is a bitmask of depths:
+    the assignments that, with the clues, explain a failure. When every value of a cell fails, the search
+    returns to the deepest assignment of its conflict set instead of the previous one, and the assignments
+    of the set are learned as a nogood when a NogoodStore is given
+    '''
+
+    def __init__(self, board, nogoods=None):
+        cells = board.n * board.n
+        self.board = board
+        self.nogoods = nogoods
+        self.order = [None]  # cell assigned at every depth
+        self.depth_of = [0] * cells  # depth of the assignment of every cell, 0 for clues and unassigned cells
+        self.past_fc = [0] * cells  # depths whose forward checking narrowed the domain of every cell
+        self.pruned = [[]]  # cells narrowed at every depth
+        self.backjumps = 0  # assignments undone without trying their other values
+
+    def forward_check(self, var, value, depth):
+        # Board.forward_checking() for one assignment that also records the cells it narrows.
+        # Returns 0, or the conflict set of the domain it wiped out
+        board = self.board
+        values = board.values
+        trail = board.trail
+        past_fc = self.past_fc
+        pruned = self.pruned[depth]
+        bit = 1 << depth
+        board.keep_value(var, value)  # assigned cells are skipped below, so their domains are set here
+        for other_var in board.peers[var]:
+            if values[other_var] == 0 and board.has_value(other_var, value):
+                pruned.append(other_var)
+                past_fc[other_var] |= bit
+                if not board.remove_value(other_var, value):
+                    return past_fc[other_var]
+        for other_var, sign in board.arcs[var]:
+            if values[other_var] != 0:
+                continue  # its own forward checking already kept var consistent with it
+            before = len(trail)
+            if sign == '<':
+                ok = board.keep_range(other_var, value + 1, board.n)
+            else:
+                ok = board.keep_range(other_var, 1, value - 1)
+            if len(trail) > before:
+                pruned.append(other_var)
+                past_fc[other_var] |= bit
+            if not ok:
+                return past_fc[other_var]
+        return 0
+
+    def undo(self, depth, mark):
+        self.board.undo(mark)
+        keep = ~(1 << depth)
+        for other_var in self.pruned[depth]:
+            self.past_fc[other_var] &= keep
+        self.pruned[depth].clear()
+
+    def search(self, depth=0):
+        '''
+        Searches below depth. Returns True once the board is solved, otherwise the conflict set of the failure
+        (0 when the board has no solution at all)
+        '''
+        board = self.board
+        values = board.values
+        var = board.select_unassigned_variable()
+        if var is None:
+            board.create_solved_board()
+            return True
+
+        depth += 1
+        bit = 1 << depth
+        if len(self.order) <= depth:
+            self.order.append(None)
+            self.pruned.append([])
+        self.order[depth] = var
+        self.depth_of[var] = depth
+        conflicts = 0
+        for value in board.order_values(var):
+            mark = board.mark()
+            values[var] = value
+            board.nodes += 1
+            nogood = None if self.nogoods is None else self.nogoods.violated(var, value, values)
+            if nogood is not None:
+                failure = 0
+                for other_var, _ in nogood:
+                    failure |= 1 << self.depth_of[other_var]
+            else:
+                failure = self.forward_check(var, value, depth)
+                if failure == 0:
+                    failure = self.search(depth)
+                    if failure is True:
+                        return True
+                    if not failure & bit:  # var is not to blame, jump over it
+                        self.undo(depth, mark)
+                        values[var] = 0
+                        self.depth_of[var] = 0
+                        board.release_variable(var)
+                        self.backjumps += 1
+                        return failure
+            conflicts |= failure & ~bit
+            self.undo(depth, mark)
+            values[var] = 0
+
+        self.depth_of[var] = 0
+        board.release_variable(var)
+        # every value of var failed: through the assignments of conflicts or the ones that pruned it
+        conflicts |= self.past_fc[var]
+        if self.nogoods is not None and conflicts:
+            nogood = []
+            rest = conflicts
+            while rest:
+                low = rest & -rest
+                other_var = self.order[low.bit_length() - 1]
+                nogood.append((other_var, values[other_var]))
+                rest ^= low
+            self.nogoods.add(frozenset(nogood), nogood[-1])  # the deepest assignment is undone first
+        return conflicts
+
+
+def solve_board_cbj(board, propagation='fc', heuristic='mrv', nogoods=None):
+    '''
+    solve_board() with conflict-directed backjumping (BackjumpSearch) instead of chronological backtracking,
+    learning into nogoods when a NogoodStore is given. The search does its own forward checking, propagation
+    only applies to the root.
+    Returns the solved board and the runtime
+    '''
+    start_time = time.time()
+    board.propagation = propagation
+    board.heuristic = heuristic
+    solved = False
+    if board.contradiction is None and (propagation == 'fc' or board.propagate(range(board.n * board.n))):
+        if heuristic != 'mrv':
+            board.buckets = DomainBuckets(board, degree=heuristic in ('degree', 'lcv'))
+        solved = BackjumpSearch(board, nogoods).search() is True
+        board.buckets = None
+    board.status = 'solved' if solved else 'unsat'
+    if not solved:
+        return None, -1
+    return board, time.time() - start_time
+
+
+def solve_board_search(board, propagation='fc', heuristic='mrv', search='backtracking', timeout=None, max_nodes=None,
+                       nogoods=10000):
+    '''
+    Solves the board with one of SEARCHES: solve_board(), or solve_board_iterative() when a budget is given
+    (backtracking only), solve_board_cbj() with a NogoodStore of nogoods capacity for 'nogoods'
+    or dlx.solve_board_dlx().
+    Returns the solved board (None when there is no solution or the budget ran out) and the runtime
+    '''
+    if search not in SEARCHES:
+        raise Exception("Unknown search %s" % search)
+    if search != 'backtracking' and (timeout is not None or max_nodes is not None):
+        raise Exception("Only the backtracking search takes a timeout or a node budget")
+    if search in ('backjump', 'nogoods'):
+        return solve_board_cbj(board, propagation, heuristic, NogoodStore(nogoods) if search == 'nogoods' else None)
+    if search == 'dlx':
+        from dlx import solve_board_dlx
+        return solve_board_dlx(board, propagation, heuristic)
+    if timeout is None and max_nodes is None:
+        return solve_board(board, propagation, heuristic)
+    status, solved_board, runtime = solve_board_iterative(board, propagation, heuristic, timeout, max_nodes)
+    if status != 'solved':
+        return None, -1
+    return solved_board, runtime
+
+
+class SearchStats:
+    '''
+    Counters of one search, filled by backtracking() when attached to board.stats, and optional hooks:
+    on_assign(board, var, value, depth) before the propagation of an assignment,
+    on_propagate(board, var, value, ok) after it, ok is False if it wiped out a domain,
+    on_backtrack(board, var, value, depth) before an assignment is undone
+    '''
+
+    def __init__(self, on_assign=None, on_backtrack=None, on_propagate=None):
+        self.on_assign = on_assign
+        self.on_backtrack = on_backtrack
+        self.on_propagate = on_propagate
+        self.nodes = 0  # assignments tried
+        self.backtracks = 0  # assignments undone
+        self.propagation_failures = 0  # assignments whose propagation wiped out a domain
+        self.values_pruned = 0  # values removed from the domains by the propagation
+        self.max_depth = 0  # deepest assignment, the first one is at depth 1
+        self.branching = {}  # depth -> {domain size of the selected variable: times}
+        self.propagation_time = 0.0
+        self.select_time = 0.0
+
+    def select(self, board):
+        start_time = time.perf_counter()
+        var = board.select_unassigned_variable()
+        self.select_time += time.perf_counter() - start_time
+        return var
+
+    def expand(self, depth, branches):
+        histogram = self.branching.setdefault(depth, {})
+        histogram[branches] = histogram.get(branches, 0) + 1
+
+    def propagate(self, board, var, value, depth, mark):
+        self.nodes += 1
+        self.max_depth = max(self.max_depth, depth + 1)
+        if self.on_assign is not None:
+            self.on_assign(board, var, value, depth)
+
+        start_time = time.perf_counter()
+        result = board.propagate([var])
+        self.propagation_time += time.perf_counter() - start_time
+
+        # walk the new trail entries backwards: each one was narrowed down to the next state of its variable
+        later = {}
+        for changed_var, old_domain in reversed(board.trail[mark:]):
+            new_domain = later.get(changed_var, board.domains[changed_var])
+            self.values_pruned += board.count_values(old_domain) - board.count_values(new_domain)
+            later[changed_var] = old_domain
+
+        if result is None:
+            self.propagation_failures += 1
+        if self.on_propagate is not None:
+            self.on_propagate(board, var, value, result is not None)
+        return result
+
+    def backtrack(self, board, var, value, depth):
+        self.backtracks += 1
+        if self.on_backtrack is not None:
+            self.on_backtrack(board, var, value, depth)
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'propagation_failures': self.propagation_failures,
+            'values_pruned': self.values_pruned,
+            'max_depth': self.max_depth,
+            'branching': {depth: dict(histogram) for depth, histogram in sorted(self.branching.items())},
+            'propagation_time': self.propagation_time,
+            'select_time': self.select_time,
+        }
+
+
+def solve_board_with_stats(board, propagation='fc', on_assign=None, on_backtrack=None, on_propagate=None,
+                           heuristic='mrv'):
+    '''
+    solve_board() with a SearchStats attached to the search.
+    Returns the solved board, the runtime and the SearchStats
+    '''
+    stats = SearchStats(on_assign, on_backtrack, on_propagate)
+    board.stats = stats
+    try:
+        solved_board, runtime = solve_board(board, propagation, heuristic)
+    finally:
+        board.stats = None
+    return solved_board, runtime, stats
+
+
+def print_search_stats(stats):
+    '''
+    Prints the counters of a SearchStats
+    '''
+    print("\nSearch Statistics:")
+    print("Nodes = {:d}".format(stats.nodes))
+    print("Backtracks = {:d}".format(stats.backtracks))
+    print("Propagation Failures = {:d}".format(stats.propagation_failures))
+    print("Values Pruned = {:d}".format(stats.values_pruned))
+    print("Max Depth = {:d}".format(stats.max_depth))
+    print("Propagation Time = {:.8f}".format(stats.propagation_time))
+    print("Variable Selection Time = {:.8f}".format(stats.select_time))
+    print("Branching (depth: domain size x times):")
+    for depth, histogram in sorted(stats.branching.items()):
+        print("  {:d}: {:s}".format(depth, ", ".join("%dx%d" % item for item in sorted(histogram.items()))))
+
+
+def solve_config(config_string, engine='list', propagation='fc', heuristic='mrv', timeout=None, max_nodes=None,
+                 search='backtracking', nogoods=10000):
+    '''
+    Builds and solves the board of config_string with solve_board_search().
+    Returns the solved configuration string (None if there is no solution or the budget ran out) and the runtime
+    '''
+    return solve_built_board(ENGINES[engine](config_string), propagation, heuristic, timeout, max_nodes, search,
+                             nogoods)
+
+
+def solve_built_board(board, propagation='fc', heuristic='mrv', timeout=None, max_nodes=None, search='backtracking',
+                      nogoods=10000):
+    '''
+    Second half of solve_config(), for boards that were not built from a string (see corpus.py)
+    '''
+    solved_board, runtime = solve_board_search(board, propagation, heuristic, search, timeout, max_nodes, nogoods)
+    if solved_board is None:
+        return None, runtime
+    return solved_board.get_config_str(), runtime
+
+
+def board_error(config_string):
+    '''
+    Why config_string is not a board (the message of parse_config()), None when it is one
+    '''
+    try:
+        parse_config(config_string)
+    except Exception as error:
+        return str(error)
+    return None
+
+
+def _solve_chunk(task):
+    # worker side of solve_batch(): one chunk of boards per message, a string that is not a board gives (None, -1)
+    config_strings, options = task
+    options = dict(options)
+    board_class = ENGINES[options.pop('engine')]
+    results = []
+    for config_string in config_strings:
+        try:
+            board = board_class(config_string)
+        except Exception:
+            results.append((None, -1))  # see board_error()
+            continue
+        results.append(solve_built_board(board, **options))
+    return results
+
+
+def solve_batch(config_strings, workers=None, chunksize=None, engine='list', propagation='fc', heuristic='mrv',
+                timeout=None, max_nodes=None, search='backtracking', nogoods=10000, cache=None):
+    '''
+    Solves many boards on a pool of worker processes (workers=None uses every core).
+    Boards are sent in chunks of chunksize so small boards do not pay one round trip each;
+    by default each worker gets about 4 chunks. The other arguments are those of solve_config().
+    With a SolutionCache, the boards it answers are not sent to the workers and the others are added to it.
+    Returns the (solved string or None, runtime) pairs in the order of config_strings, None also for a string
+    that is not a board (see board_error())
+    '''
+    config_strings = list(config_strings)
+    if cache is not None:
+        plan, misses = cache.split(config_strings, ENGINES[engine])
+        results = solve_batch(misses, workers, chunksize, engine, propagation, heuristic, timeout, max_nodes, search,
+                              nogoods)
+        return cache.merge(plan, results, timeout is None and max_nodes is None)
+    workers = workers or multiprocessing.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(config_strings) // (workers * 4))
+    options = dict(engine=engine, propagation=propagation, heuristic=heuristic, timeout=timeout, max_nodes=max_nodes,
+                   search=search, nogoods=nogoods)
+    tasks = [(config_strings[i:i + chunksize], options)
+             for i in range(0, len(config_strings), chunksize)]
+
+    results = []
+    if workers == 1:
+        for task in tasks:
+            results.extend(_solve_chunk(task))
+        return results
+    with multiprocessing.Pool(workers) as pool:
+        for chunk in pool.imap(_solve_chunk, tasks):  # imap keeps the input order
+            results.extend(chunk)
+    return results
+
+
+def solve_stream(config_strings, workers=1, chunksize=64, engine='list', propagation='fc', heuristic='mrv',
+                 timeout=None, max_nodes=None, search='backtracking', nogoods=10000, cache=None):
+    '''
+    Lazy counterpart of solve_batch() for inputs that do not fit in memory.
+    config_strings can be any iterable (e.g. iter_boards()); it is read one chunk at a time and at most
+    2 chunks per worker are in flight, so memory does not grow with the input.
+    With a SolutionCache, each chunk is looked up before only its misses are sent to the workers.
+    Yields, in input order, one list of (config string, solved string or None, runtime) per chunk, with None
+    also for a string that is not a board (see board_error())
+    '''
+    options = dict(engine=engine, propagation=propagation, heuristic=heuristic, timeout=timeout, max_nodes=max_nodes,
+                   search=search, nogoods=nogoods)
+    config_strings = iter(config_strings)
+    chunks = iter(lambda: list(itertools.islice(config_strings, chunksize)), [])
+    complete = timeout is None and max_nodes is None  # a board without solution is unsolvable
+
+    def split(chunk):
+        # (plan of the cache or None, strings to solve)
+        if cache is None:
+            return None, chunk
+        return cache.split(chunk, ENGINES[engine])
+
+    def answers(chunk, plan, results):
+        if plan is not None:
+            results = cache.merge(plan, results, complete)
+        return [(config_string, solved_str, runtime) for config_string, (solved_str, runtime) in zip(chunk, results)]
+
+    if workers <= 1:
+        for chunk in chunks:
+            plan, misses = split(chunk)
+            yield answers(chunk, plan, _solve_chunk((misses, options)))
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                plan, misses = split(chunk)
+                pending.append((chunk, plan, pool.apply_async(_solve_chunk, ((misses, options),))))
+            while pending and (chunk is None or len(pending) >= 2 * workers):
+                done_chunk, plan, results = pending.popleft()
+                yield answers(done_chunk, plan, results.get())
+
+
+def iter_boards(src_filename):
     '''
-    Prints a statistical summary of the runtimes of all the boards
+    Yields the configuration strings of src_filename one line at a time, skipping blank lines
     '''
-    min = 100000000000
-    max = 0
-    sum = 0
-    n = len(runtimes)
+    with open(src_filename, "r") as srcfile:
+        for line in srcfile:
+            line = line.strip()
+            if line:
+                yield line
 
-    for runtime in runtimes:
-        sum += runtime
-        if(runtime < min):
-            min = runtime
-        if(runtime > max):
-            max = runtime
 
-    mean = sum/n
+class RuntimeStats:
+    '''
+    Running count, min, max, mean and standard deviation of runtimes in constant memory (Welford's algorithm)
+    '''
+
+    def __init__(self, runtimes=()):
+        self.n = 0
+        self.min = float('inf')
+        self.max = 0
+        self.sum = 0
+        self.mean = 0
+        self.m2 = 0  # sum of squared differences to the mean
+        for runtime in runtimes:
+            self.add(runtime)
 
-    sum_diff_squared = 0
+    def add(self, runtime):
+        self.n += 1
+        self.sum += runtime
+        self.min = min(self.min, runtime)
+        self.max = max(self.max, runtime)
+        delta = runtime - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (runtime - self.mean)
 
-    for runtime in runtimes:
-        sum_diff_squared += (runtime-mean)*(runtime-mean)
+    def std_dev(self):
+        return np.sqrt(self.m2 / self.n)
 
-    std_dev = np.sqrt(sum_diff_squared/n)
+
+def print_stats(runtimes, wall_time=None):
+    '''
+    Prints a statistical summary of the runtimes of all the boards, given as a list or a RuntimeStats.
+    With the wall_time of the whole run, also prints the throughput
+    '''
+    stats = runtimes if isinstance(runtimes, RuntimeStats) else RuntimeStats(runtimes)
 
     print("\nRuntime Statistics:")
-    print("Number of Boards = {:d}".format(n))
-    print("Min Runtime = {:.8f}".format(min))
-    print("Max Runtime = {:.8f}".format(max))
-    print("Mean Runtime = {:.8f}".format(mean))
-    print("Standard Deviation of Runtime = {:.8f}".format(std_dev))
-    print("Total Runtime = {:.8f}".format(sum))
+    print("Number of Boards = {:d}".format(stats.n))
+    if stats.n > 0:
+        print("Min Runtime = {:.8f}".format(stats.min))
+        print("Max Runtime = {:.8f}".format(stats.max))
+        print("Mean Runtime = {:.8f}".format(stats.mean))
+        print("Standard Deviation of Runtime = {:.8f}".format(stats.std_dev()))
+        print("Total Runtime = {:.8f}".format(stats.sum))
+    if wall_time is not None:
+        print("Wall Time = {:.8f}".format(wall_time))
+        print("Throughput = {:.2f} boards/sec".format(stats.n / wall_time))
+
+
+def failure_reason(board):
+    '''
+    Why solving board gave no solution, for the messages of the command line
+    '''
+    if board.contradiction is not None:
+        return board.contradiction
+    if board.status in ('timeout', 'cancelled'):
+        return "%s after %d search nodes" % (board.status, board.nodes)
+    return "the search found none"
 
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Futoshiki solver")
+    parser.add_argument('config', nargs='?', help="configuration string of a single board")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='list',
+                        help="domain representation used by the solver (default: list)")
+    parser.add_argument('--propagation', choices=PROPAGATIONS, default='fc',
+                        help="propagation after every assignment (default: fc, forward checking)")
+    parser.add_argument('--heuristic', choices=HEURISTICS, default='mrv',
+                        help="variable and value ordering of the search (default: mrv)")
+    parser.add_argument('--search', choices=SEARCHES, default='backtracking',
+                        help="search algorithm (default: backtracking)")
+    parser.add_argument('--nogoods', type=int, metavar='CAPACITY', default=10000,
+                        help="with --search nogoods, number of nogoods kept for a board")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="solve the boards of the input file on this many processes, without printing them")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="boards sent to a worker at a time with --workers (default: about 4 chunks per worker)")
+    parser.add_argument('--input', default='futoshiki_start.txt', help="file with one board per line")
+    parser.add_argument('--output', default='output.txt', help="file the solutions are written to")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the input lazily and write the solutions in bulk, in constant memory")
+    parser.add_argument('--verbose', action='store_true', help="with --stream, also print every board")
+    parser.add_argument('--cache', metavar='PATH', default=None,
+                        help="answer repeated and symmetric boards from a solution cache persisted in PATH")
+    parser.add_argument('--cache-size', type=int, default=10000, help="number of boards kept in the cache")
+    parser.add_argument('--stats', action='store_true',
+                        help="print the search statistics of every board (single board and default file modes)")
+    parser.add_argument('--timeout', type=float, metavar='SECONDS', default=None,
+                        help="give up on a board after this long (iterative search)")
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help="give up on a board after this many search nodes (iterative search)")
+    parser.add_argument('--count', type=int, metavar='LIMIT', default=None,
+                        help="count the solutions of every board instead of solving it, up to LIMIT (0: all)")
+    args = parser.parse_args()
+    board_class = ENGINES[args.engine]
+
+    corpus_input = False  # binary corpus written by corpus.py instead of a text file
+    if not args.config:
+        from corpus import Corpus, is_corpus, solve_corpus
+        try:
+            corpus_input = is_corpus(args.input)
+        except OSError:
+            pass  # reported by the mode reading the file
+
+    if args.count is not None:
+        # Counting mode: number of solutions of every board, 2 is enough to check uniqueness
+        if (args.search != 'backtracking' or args.timeout is not None or args.max_nodes is not None or args.stats
+                or args.cache or args.workers or args.stream):
+            parser.error("--count only takes --engine, --propagation, --heuristic and the input options")
+        if corpus_input:
+            # boards built from the records as Corpus.boards() does, one at a time so a bad record is only reported
+            corpus = Corpus(args.input)
+            inputs = (("record %d" % index, cells) for index, cells in enumerate(corpus.cells()))
+        else:
+            config_strings = [args.config] if args.config else iter_boards(args.input)
+            inputs = ((config_string, config_string) for config_string in config_strings)
+        for name, source in inputs:
+            try:
+                board = board_class.from_cells(corpus.n, *source) if corpus_input else board_class(source)
+            except Exception as error:
+                print("%s invalid: %s" % (name, error))
+                continue
+            count, nodes = count_solutions(board, args.count or None, args.propagation, args.heuristic)
+            limit_reached = args.count and count >= args.count
+            print("%s solutions=%d%s nodes=%d" % (board.get_config_str(), count, "+" if limit_reached else "", nodes))
+        exit()
+
+    budget = args.timeout is not None or args.max_nodes is not None
+    if budget and args.search != 'backtracking':
+        parser.error("--timeout and --max-nodes only apply to --search backtracking")
+    if args.stats and (budget or args.search != 'backtracking'):
+        parser.error("--stats only applies to --search backtracking without --timeout or --max-nodes")
+    if args.stats and not args.config and (args.workers or args.stream or corpus_input):
+        parser.error("--stats only applies to the single board and default file modes, not to --workers, --stream "
+                     "or a binary corpus")
+
+    def solve(board, propagation, heuristic):
+        if args.stats:
+            solved_board, runtime, stats = solve_board_with_stats(board, propagation, heuristic=heuristic)
+            print_search_stats(stats)
+            return solved_board, runtime
+        return solve_board_search(board, propagation, heuristic, args.search, args.timeout, args.max_nodes,
+                                  args.nogoods)
+
+    if args.cache and corpus_input:
+        parser.error("--cache does not apply to a binary corpus, whose records are decoded by the workers")
+    cache = None
+    if args.cache:
+        from solution_cache import SolutionCache
+        cache = SolutionCache(args.cache_size, args.cache, solve)
+        solve = cache.solve
+
+    if args.config:
 
         # Running futoshiki solver with one board $python3 futoshiki.py <input_string>.
+        error = board_error(args.config)
+        if error is not None:
+            parser.error("invalid board %s: %s" % (args.config, error))
+
         print("\nInput String:")
-        print(sys.argv[1])
+        print(args.config)
         
         print("\nFormatted Input Board:")
-        board = Board(sys.argv[1])
+        board = board_class(args.config)
         board.print_board()
         
-        solved_board, runtime = solve_board(board)
+        solved_board, runtime = solve(board, args.propagation, args.heuristic)
+        if args.cache:
+            cache.save()
+        if solved_board is None:
+            print("\nNo solution: %s" % failure_reason(board))
+            exit(1)
         
         print("\nSolved String:")
         print(solved_board.get_config_str())
@@ -498,17 +1875,93 @@ if __name__ == '__main__':
         print_stats([runtime])
 
         # Write board to file
-        out_filename = 'output.txt'
+        out_filename = args.output
         outfile = open(out_filename, "w")
         outfile.write(solved_board.get_config_str())
         outfile.write('\n')
         outfile.close()
 
+    elif corpus_input:
+        # Corpus mode: the records are decoded in bulk by the workers, solutions written in bulk
+        corpus = Corpus(args.input)
+        stats = RuntimeStats()
+        start_time = time.time()
+        start = 0
+        with open(args.output, "w", buffering=1 << 20) as outfile:
+            for results in solve_corpus(args.input, max(args.workers, 1), args.chunksize or 256, args.engine,
+                                        args.propagation, args.heuristic, args.timeout, args.max_nodes,
+                                        args.search, args.nogoods):
+                if args.verbose:
+                    for config_string, (solved_str, _) in zip(corpus.config_strings(start, start + len(results)), results):
+                        print("\nInput String:")
+                        print(config_string)
+                        print("\nSolved String:")
+                        print(solved_str or "No solution")
+                for index, (solved_str, _) in enumerate(results, start):
+                    if solved_str is None:
+                        try:
+                            Board.from_cells(corpus.n, *next(corpus.cells(index, index + 1)))
+                        except Exception as error:
+                            print("\nInvalid record %d: %s" % (index, error))
+                start += len(results)
+                lines = []
+                for solved_str, runtime in results:
+                    if solved_str is None:
+                        lines.append('')
+                        continue
+                    stats.add(runtime)
+                    lines.append(solved_str)
+                lines.append('')
+                outfile.write('\n'.join(lines))
+        print_stats(stats, time.time() - start_time)
+        print("\nFinished all boards in file.\n")
+
+    elif args.stream:
+        # Streaming mode: boards are read one chunk at a time, solutions written in bulk
+        stats = RuntimeStats()
+        start_time = time.time()
+        chunksize = args.chunksize or 256
+        with open(args.output, "w", buffering=1 << 20) as outfile:
+            for chunk in solve_stream(iter_boards(args.input), max(args.workers, 1), chunksize,
+                                      args.engine, args.propagation, args.heuristic, args.timeout, args.max_nodes,
+                                      args.search, args.nogoods, cache):
+                lines = []
+                for config_string, solved_str, runtime in chunk:
+                    error = board_error(config_string) if solved_str is None else None
+                    if error is not None:
+                        print("\nInvalid board %s: %s" % (config_string, error))
+                        lines.append('')
+                        continue
+                    if args.verbose:
+                        print("\nInput String:")
+                        print(config_string)
+                        print("\nFormatted Input Board:")
+                        Board(config_string).print_board()
+                    if solved_str is None:
+                        lines.append('')
+                        if args.verbose:
+                            print("\nNo solution")
+                        continue
+                    stats.add(runtime)
+                    lines.append(solved_str)
+                    if args.verbose:
+                        print("\nSolved String:")
+                        print(solved_str)
+                        print("\nFormatted Solved Board:")
+                        Board(solved_str).print_board()
+                lines.append('')
+                outfile.write('\n'.join(lines))
+        print_stats(stats, time.time() - start_time)
+        if args.cache:
+            cache.save()
+            print("Cache = {hits:d} hits, {misses:d} misses, {size:d} boards".format(**cache.stats()))
+        print("\nFinished all boards in file.\n")
+
     else:
         # Running futoshiki solver for boards in futoshiki_start.txt $python3 futoshiki.py
 
         #  Read boards from source.
-        src_filename = 'futoshiki_start.txt'
+        src_filename = args.input
         try:
             srcfile = open(src_filename, "r")
             futoshiki_list = srcfile.read()
@@ -518,22 +1971,58 @@ if __name__ == '__main__':
             exit()
 
         # Setup output file
-        out_filename = 'output.txt'
+        out_filename = args.output
         outfile = open(out_filename, "w")
         
         runtimes = []
 
+        if args.workers:
+            # Batch mode: solve on a process pool, only the statistics are printed
+            start_time = time.time()
+            config_strings = [line for line in futoshiki_list.split("\n") if line.strip()]
+            results = solve_batch(config_strings, args.workers, args.chunksize, args.engine, args.propagation,
+                                  args.heuristic, args.timeout, args.max_nodes, args.search, args.nogoods, cache)
+            wall_time = time.time() - start_time
+            for config_string, (solved_str, runtime) in zip(config_strings, results):
+                if solved_str is None:
+                    error = board_error(config_string)
+                    if error is not None:
+                        print("\nInvalid board %s: %s" % (config_string, error))
+                    outfile.write('\n')
+                    continue
+                runtimes.append(runtime)
+                outfile.write(solved_str)
+                outfile.write('\n')
+            outfile.close()
+            print_stats(runtimes, wall_time)
+            if args.cache:
+                cache.save()
+                print("Cache = {hits:d} hits, {misses:d} misses, {size:d} boards".format(**cache.stats()))
+            print("\nFinished all boards in file.\n")
+            exit()
+
         # Solve each board using backtracking
         for line in futoshiki_list.split("\n"):
+            if not line.strip():
+                continue  # blank or trailing line
             
             print("\nInput String:")
             print(line)
             
+            try:
+                board = board_class(line)
+            except Exception as error:
+                print("\nInvalid board: %s" % error)
+                outfile.write('\n')  # keep the solutions on the lines of their boards
+                continue
             print("\nFormatted Input Board:")
-            board = Board(line)
             board.print_board()
             
-            solved_board, runtime = solve_board(board)
+            solved_board, runtime = solve(board, args.propagation, args.heuristic)
+            if solved_board is None:
+                print("\nNo solution: %s" % failure_reason(board))
+                outfile.write('\n')
+                continue
             runtimes.append(runtime)
             
             print("\nSolved String:")
@@ -548,6 +2037,9 @@ if __name__ == '__main__':
 
         # Timing Runs
         print_stats(runtimes)
+        if args.cache:
+            cache.save()
+            print("Cache = {hits:d} hits, {misses:d} misses, {size:d} boards".format(**cache.stats()))
         
         outfile.close()
         print("\nFinished all boards in file.\n")
@@ -0,0 +1,198 @@
+"""
+Random futoshiki puzzles.
+
+A puzzle is cut from a random Latin square: each cell is kept as a clue with
+probability clue_density and each pair of adjacent cells gets the inequality
+of the square with probability inequality_density. Puzzles always have a
+solution but it is not necessarily unique.
+
+With --unique, every puzzle has exactly one solution instead: the clues are
+removed from the full square one by one as long as the solution stays unique,
+and each puzzle can be graded (easy, medium, hard, expert) from the search
+it needs.
+
+$python3 generator.py <n> [--count N] [--seed S]
+$python3 generator.py <n> --unique [--count N] [--difficulty hard] [--grade] [--workers W]
+"""
+import argparse
+import itertools
+import multiprocessing
+import random
+
+from futoshiki import DELIMITER, BitsetBoard, backtracking, solve_board_with_stats
+
+
+def random_latin_square(n, rng):
+    '''
+    Returns the values of a random n x n Latin square, row by row.
+    A cyclic square with its rows, columns and symbols shuffled
+    '''
+    rows = list(range(n))
+    cols = list(range(n))
+    symbols = list(range(1, n + 1))
+    rng.shuffle(rows)
+    rng.shuffle(cols)
+    rng.shuffle(symbols)
+    return [symbols[(rows[r] + cols[c]) % n] for r in range(n) for c in range(n)]
+
+
+def to_config_string(n, values, less_pairs):
+    '''
+    Returns the configuration string of a board given its values (0 for empty) and the set of
+    (smaller cell, bigger cell) pairs. Boards bigger than 9x9 are written comma separated
+    '''
+    def sign(var, other_var):
+        if (var, other_var) in less_pairs:
+            return '<'
+        if (other_var, var) in less_pairs:
+            return '>'
+        return '-'
+
+    tokens = []
+    for r in range(n):
+        for c in range(n):
+            var = r * n + c
+            tokens.append(str(values[var]))
+            if c < n - 1:
+                tokens.append(sign(var, var + 1))
+        if r < n - 1:
+            for c in range(n):
+                var = r * n + c
+                tokens.append(sign(var, var + n))
+    return (DELIMITER if n > 9 else '').join(tokens)
+
+
+def random_puzzle(n, clue_density, inequality_density, rng):
+    '''
+    Returns the configuration string of a random puzzle and the values of the square it was cut from
+    '''
+    solution = random_latin_square(n, rng)
+    values = [value if rng.random() < clue_density else 0 for value in solution]
+    less_pairs = random_inequalities(n, solution, inequality_density, rng)
+    return to_config_string(n, values, less_pairs), solution
+
+
+def random_inequalities(n, solution, inequality_density, rng):
+    '''
+    Returns the (smaller cell, bigger cell) pairs of the inequalities given to adjacent cells of solution,
+    each pair with probability inequality_density
+    '''
+    less_pairs = set()
+    for var in range(n * n):
+        neighbours = []
+        if var % n < n - 1:
+            neighbours.append(var + 1)
+        if var // n < n - 1:
+            neighbours.append(var + n)
+        for other_var in neighbours:
+            if rng.random() < inequality_density:
+                if solution[var] < solution[other_var]:
+                    less_pairs.add((var, other_var))
+                else:
+                    less_pairs.add((other_var, var))
+    return less_pairs
+
+
+def has_other_solution(board, values, var, value):
+    '''
+    Uniqueness check of one clue removal, on a board holding the inequalities of the puzzle.
+    The puzzle values without the clue of var is known to have a unique solution once the clue is put
+    back, so it stays unique exactly when no solution gives var another value: a single search with
+    value removed from var instead of a count of all the solutions
+    '''
+    board.load_values(values)
+    if board.contradiction is not None or not board.remove_value(var, value):
+        return False
+    return backtracking(board) is not None
+
+
+GRADES = ('easy', 'medium', 'hard', 'expert')
+
+
+def grade(config_string):
+    '''
+    Difficulty of a puzzle with a unique solution, from the search statistics:
+    'easy' if the gac propagation alone solves it, 'medium' if the search never has to undo a value,
+    'hard' up to 2 * n undone values and 'expert' above
+    '''
+    board = BitsetBoard(config_string)
+    n = board.n
+    board.propagation = 'gac'
+    mark = board.mark()
+    if board.propagate(range(n * n)) and all(board.domain_size(var) == 1 for var in range(n * n)):
+        return 'easy'
+    board.undo(mark)
+    _, _, stats = solve_board_with_stats(board, 'gac')
+    if stats.backtracks == 0:
+        return 'medium'
+    if stats.backtracks <= 2 * n:
+        return 'hard'
+    return 'expert'
+
+
+def unique_puzzle(n, inequality_density, rng):
+    '''
+    Returns the configuration string of a random puzzle with a unique solution and the solution.
+    Starts from a full Latin square with random inequalities and removes the clues, in random order,
+    whenever the puzzle stays unique without them
+    '''
+    solution = random_latin_square(n, rng)
+    less_pairs = random_inequalities(n, solution, inequality_density, rng)
+    values = list(solution)
+    board = BitsetBoard(to_config_string(n, values, less_pairs))  # tables built once, reloaded for each check
+    order = list(range(n * n))
+    rng.shuffle(order)
+    for var in order:
+        value = values[var]
+        values[var] = 0
+        if has_other_solution(board, values, var, value):
+            values[var] = value  # needed
+    return to_config_string(n, values, less_pairs), solution
+
+
+def _unique_task(task):
+    # worker side of the --unique mode: one seed per puzzle, so the output does not depend on --workers
+    n, inequality_density, seed = task
+    config_string, _ = unique_puzzle(n, inequality_density, random.Random(seed))
+    return config_string, grade(config_string)
+
+
+def unique_puzzles(n, inequality_density, seed=None, workers=1):
+    '''
+    Yields an endless stream of (configuration string, grade) of unique puzzles, built on workers processes
+    '''
+    base = random.Random(seed).getrandbits(64)
+    tasks = ((n, inequality_density, "%d:%d" % (base, index)) for index in itertools.count())
+    if workers <= 1:
+        for task in tasks:
+            yield _unique_task(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap(_unique_task, tasks, chunksize=8):
+            yield result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Print random futoshiki puzzles, one per line")
+    parser.add_argument('n', type=int, help="side of the boards")
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--clues', type=float, default=0.2, help="probability that a cell is a clue")
+    parser.add_argument('--inequalities', type=float, default=0.3, help="probability that two adjacent cells get an inequality")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--unique', action='store_true', help="only puzzles with a unique solution, with few clues")
+    parser.add_argument('--difficulty', choices=GRADES, default=None, help="with --unique, only puzzles of this grade")
+    parser.add_argument('--grade', action='store_true', help="with --unique, print the grade after each puzzle")
+    parser.add_argument('--workers', type=int, default=1, help="with --unique, processes building the puzzles")
+    args = parser.parse_args()
+
+    if args.unique:
+        puzzles = unique_puzzles(args.n, args.inequalities, args.seed, args.workers)
+        if args.difficulty:
+            puzzles = (puzzle for puzzle in puzzles if puzzle[1] == args.difficulty)
+        for config_string, difficulty in itertools.islice(puzzles, args.count):
+            print(config_string + (" " + difficulty if args.grade else ""))
+        exit()
+
+    rng = random.Random(args.seed)
+    for _ in range(args.count):
+        print(random_puzzle(args.n, args.clues, args.inequalities, rng)[0])
@@ -0,0 +1,222 @@
+"""
+Portfolio solving: several solver configurations race on every board.
+
+The runtime of a hard board can change by orders of magnitude with the
+variable and value orders. A Portfolio keeps one worker process per
+configuration of CONFIGURATIONS, sends every board to all of them and takes
+the first definite answer ('solved' or 'unsat') as soon as it arrives. The
+other workers are then cancelled through the shared id of the board being
+raced, which the search reads every 64 nodes, and their late answers are
+dropped.
+Every board reports the configuration that won, and the win counts show
+which defaults suit a mix of boards.
+
+Randomized configurations break the ties of the MRV scan and order the
+values at random (futoshiki.Board.rng) and restart the search from the clues
+after a node budget that follows the Luby sequence (unit, unit, 2 unit,
+unit, unit, 2 unit, 4 unit, ...), so an unlucky early choice is not kept
+for the whole search. Every such worker gets its own seed.
+
+$python3 portfolio.py [--input boards.txt] [--configs mrv degree random random] [--timeout S] [--output PATH]
+"""
+import argparse
+import collections
+import itertools
+import multiprocessing
+import random
+import time
+
+from futoshiki import ENGINES, iter_boards, print_stats, solve_board_iterative
+
+# configurations a Portfolio can race: name -> options of race_board()
+CONFIGURATIONS = {
+    'mrv': dict(),
+    'degree': dict(heuristic='degree'),
+    'lcv': dict(heuristic='lcv'),
+    'gac': dict(propagation='gac'),
+    'random': dict(randomize=True, restart_unit=100),  # random ties, Luby restarts of 100 nodes
+    'random-gac': dict(propagation='gac', randomize=True, restart_unit=20),
+}
+DEFAULT_CONFIGS = ('mrv', 'degree', 'random', 'random')
+
+
+def luby(index):
+    '''
+    Returns the index-th term (from 0) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ...
+    '''
+    size = 1
+    power = 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        power -= 1
+        index = index % size
+    return 1 << power
+
+
+def race_board(config_string, engine='bitset', propagation='fc', heuristic='mrv', randomize=False, restart_unit=None,
+               seed=0, timeout=None, cancel=None):
+    '''
+    Solves one board with one configuration, as a portfolio worker does.
+    With randomize, ties are broken by a random.Random(seed); with restart_unit, the search starts over from
+    the clues after restart_unit * luby(i) nodes for the i-th run.
+    Returns the status (one of futoshiki.STATUSES), the solved string or None and the search nodes of all the runs
+    '''
+    board = ENGINES[engine](config_string)
+    if randomize:
+        board.rng = random.Random(seed)
+    clues = list(board.values)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    nodes = 0
+    for run in itertools.count():
+        budget = None if restart_unit is None else restart_unit * luby(run)
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            status = 'timeout'
+            break
+        status, _, _ = solve_board_iterative(board, propagation, heuristic, remaining, budget, cancel)
+        nodes += board.nodes
+        if status != 'timeout' or budget is None or board.nodes < budget:
+            break  # an answer, a cancellation or the deadline
+        board.load_values(clues)  # restart
+        board.nodes = 0
+    return status, board.get_config_str() if status == 'solved' else None, nodes
+
+
+class _BoardCancel:
+    '''
+    Cancel event of one board for solve_board_iterative(): set once the shared racing id is no longer board_id
+    '''
+
+    def __init__(self, racing, board_id):
+        self.racing = racing
+        self.board_id = board_id
+
+    def is_set(self):
+        return self.racing.value != self.board_id
+
+
+def _portfolio_worker(index, engine, options, seed, tasks, results, racing):
+    # worker side of a Portfolio: one configuration, boards until None
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        board_id, config_string, timeout = task
+        start_time = time.time()
+        try:
+            status, text, nodes = race_board(config_string, engine, seed=seed, timeout=timeout,
+                                             cancel=_BoardCancel(racing, board_id), **options)
+        except Exception as error:
+            status, text, nodes = 'error', str(error), 0
+        results.put((board_id, index, status, text, nodes, time.time() - start_time))
+
+
+class Portfolio:
+    '''
+    Worker processes racing the configurations configs (names of CONFIGURATIONS, repeated names get
+    different seeds) on every board given to solve(). Close it, or use it as a context manager, to stop them
+    '''
+
+    def __init__(self, configs=DEFAULT_CONFIGS, engine='bitset', seed=0):
+        for name in configs:
+            if name not in CONFIGURATIONS:
+                raise Exception("Unknown configuration %s, expected one of %s" % (name, ", ".join(CONFIGURATIONS)))
+        self.configs = list(configs)
+        self.racing = multiprocessing.Value('q', 0, lock=False)  # id of the board being raced, 0 once answered
+        self.results = multiprocessing.Queue()
+        self.tasks = [multiprocessing.Queue() for _ in self.configs]
+        self.workers = []
+        for index, name in enumerate(self.configs):
+            worker = multiprocessing.Process(target=_portfolio_worker, daemon=True,
+                                             args=(index, engine, CONFIGURATIONS[name], seed * 1000 + index,
+                                                   self.tasks[index], self.results, self.racing))
+            worker.start()
+            self.workers.append(worker)
+        self.boards = 0
+        self.wins = collections.Counter()  # configuration name -> boards it answered first
+
+    def solve(self, config_string, timeout=None):
+        '''
+        Races the configurations on one board, each for at most timeout seconds.
+        Returns the status, the solved string or None, the name of the winning configuration (None when
+        every one timed out or the string is not a board, whose message is then the text of an 'error')
+        and the runtime, as soon as one worker answers or every one timed out.
+        The other workers are cancelled and their answers dropped when the next board is collected
+        '''
+        start_time = time.time()
+        self.boards += 1
+        self.racing.value = self.boards
+        for tasks in self.tasks:
+            tasks.put((self.boards, config_string, timeout))
+        status, text, winner = 'timeout', None, None
+        pending = len(self.configs)
+        while pending:
+            board_id, index, worker_status, worker_text, nodes, runtime = self.results.get()
+            if board_id != self.boards:
+                continue  # late answer to a board already answered
+            pending -= 1
+            if worker_status in ('solved', 'unsat'):
+                status, text, winner = worker_status, worker_text, self.configs[index]
+                break
+            if worker_status == 'error':
+                status, text = worker_status, worker_text  # the same for every configuration, no winner
+                break
+        self.racing.value = 0
+        runtime = time.time() - start_time
+        if winner is not None:
+            self.wins[winner] += 1
+        return status, text, winner, runtime
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Race solver configurations on every board of a file")
+    parser.add_argument('--input', default='futoshiki_start.txt', help="file with one board per line")
+    parser.add_argument('--output', default=None, help="file the solutions are written to")
+    parser.add_argument('--configs', nargs='+', choices=sorted(CONFIGURATIONS), default=list(DEFAULT_CONFIGS),
+                        help="configurations to race, one process each (default: %s)" % " ".join(DEFAULT_CONFIGS))
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='bitset')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS', default=None, help="budget of every board")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the randomized configurations")
+    parser.add_argument('--verbose', action='store_true', help="print the winner of every board")
+    args = parser.parse_args()
+
+    outfile = open(args.output, "w") if args.output else None
+    runtimes = []
+    statuses = collections.Counter()
+    with Portfolio(args.configs, args.engine, args.seed) as portfolio:
+        for config_string in iter_boards(args.input):
+            status, text, winner, runtime = portfolio.solve(config_string, args.timeout)
+            statuses[status] += 1
+            if status == 'error':
+                print("Invalid board %s: %s" % (config_string, text))
+                if outfile:
+                    outfile.write('\n')
+                continue
+            runtimes.append(runtime)
+            if args.verbose:
+                print("%s %s %s %.4fs" % (config_string, status, winner, runtime))
+            if outfile:
+                outfile.write((text if status == 'solved' else '') + '\n')
+        wins = portfolio.wins
+    if outfile:
+        outfile.close()
+
+    print_stats(runtimes)
+    print(", ".join("%s = %d" % item for item in sorted(statuses.items())))
+    for name in sorted(set(args.configs)):
+        print("{:s} won {:d}".format(name, wins[name]))
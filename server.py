@@ -0,0 +1,298 @@
+"""
+Long-lived futoshiki solve service.
+
+Clients send one configuration string per line over TCP or a Unix socket and
+get one line back per board, in the order of their requests:
+
+    solved <solved configuration string>
+    unsat
+    timeout
+    error <message>
+
+The line STATS is answered with "stats" followed by the counters of the
+server as JSON: requests, cache hits, shared requests, batches, queue depth,
+latency percentiles and throughput.
+
+Requests are gathered in micro-batches (up to --batch-size boards, or those
+that arrived within --batch-delay seconds of the first one) that a process
+pool solves with futoshiki.solve_built_board and the --search of the server.
+At most --max-queue boards wait for a batch; when the queue is full the server stops reading from the sockets until
+batches complete, so clients are slowed down instead of the memory growing.
+A board that is already queued or being solved is not solved twice, and
+recent results are answered from an LRU of solved and unsolvable boards.
+
+$python3 server.py [--port 8765 | --unix PATH] [--workers N] [--batch-size 32] [--batch-delay 0.002] [--search dlx]
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from futoshiki import ENGINES, HEURISTICS, PROPAGATIONS, SEARCHES, solve_built_board
+
+
+def solve_requests(config_strings, engine='list', propagation='fc', heuristic='mrv', timeout=None, max_nodes=None,
+                   search='backtracking', nogoods=10000):
+    '''
+    Worker side of the server: solves one micro-batch.
+    Returns one (status, solved string or error message) per board, the status is one of futoshiki.STATUSES
+    or 'error' for a configuration string that is not a board
+    '''
+    results = []
+    for config_string in config_strings:
+        try:
+            board = ENGINES[engine](config_string)
+        except Exception as error:
+            results.append(('error', str(error)))
+            continue
+        solved_str, _ = solve_built_board(board, propagation, heuristic, timeout, max_nodes, search, nogoods)
+        results.append((board.status, solved_str))
+    return results
+
+
+class SolveServer:
+    '''
+    Micro-batching front end of a process pool, see the module docstring.
+    The solver options (engine, propagation, heuristic, timeout, max_nodes, search, nogoods) are passed to
+    solve_requests()
+    '''
+
+    def __init__(self, workers=None, batch_size=32, batch_delay=0.002, max_queue=1024, cache_size=10000,
+                 **options):
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_queue = max_queue
+        self.cache_size = cache_size
+        self.options = options
+        # spawned, not forked: a forked worker would inherit the sockets open at that time and keep them alive
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers, multiprocessing.get_context('spawn'))
+        self.queue = None  # (config string, future) waiting for a batch, created on the loop by serve()
+        self.slots = None  # batches in flight, at most 2 per worker
+        self.pending = {}  # config string -> future of a board queued or being solved
+        self.results = collections.OrderedDict()  # config string -> (status, text), least recently used first
+
+        self.start_time = time.time()
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.shared = 0  # requests answered by the work of an identical pending request
+        self.batches = 0
+        self.batched_boards = 0
+        self.latencies = collections.deque(maxlen=10000)  # seconds, most recent requests
+
+    async def submit(self, config_string):
+        '''
+        Returns a future of the (status, text) answer of config_string.
+        Waits while the queue is full, which is the backpressure on the connection reading the request
+        '''
+        self.requests += 1
+        if config_string in self.results:
+            self.cache_hits += 1
+            self.results.move_to_end(config_string)
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(self.results[config_string])
+            return future
+        if config_string in self.pending:
+            self.shared += 1
+            return self.pending[config_string]
+        future = asyncio.get_running_loop().create_future()
+        self.pending[config_string] = future
+        await self.queue.put((config_string, future))
+        return future
+
+    async def batcher(self):
+        # takes what is queued, waiting batch_delay for more when the batch is not full
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if len(batch) < self.batch_size and self.batch_delay > 0:
+                await asyncio.sleep(self.batch_delay)
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+            await self.slots.acquire()
+            loop.create_task(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.batched_boards += len(batch)
+        config_strings = [config_string for config_string, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.pool, functools.partial(solve_requests, config_strings,
+                                                                              **self.options))
+        except Exception as error:  # a worker died, the pool is broken
+            results = [('error', "worker failed: %s" % error)] * len(batch)
+        finally:
+            self.slots.release()
+        for (config_string, future), result in zip(batch, results):
+            del self.pending[config_string]
+            if result[0] in ('solved', 'unsat'):  # a timeout may go better next time
+                self.results[config_string] = result
+                while len(self.results) > self.cache_size:
+                    self.results.popitem(last=False)
+            future.set_result(result)
+
+    async def handle(self, reader, writer):
+        # one connection: requests are read here, answers written in order by send()
+        answers = asyncio.Queue(self.max_queue)
+        sender = asyncio.get_running_loop().create_task(self.send(answers, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                config_string = line.decode().strip()
+                if not config_string:
+                    continue
+                start = time.perf_counter()
+                if config_string == 'STATS':
+                    await answers.put((None, start))
+                    continue
+                future = await self.submit(config_string)
+                await answers.put((future, start))
+        except ConnectionError:
+            pass
+        finally:
+            await answers.put(None)
+            await sender
+            writer.close()
+
+    async def send(self, answers, writer):
+        connected = True
+        while True:
+            item = await answers.get()
+            if item is None:
+                return
+            future, start = item
+            if future is None:
+                line = "stats " + json.dumps(self.counters())
+            else:
+                status, text = await future
+                self.completed += 1
+                if status == 'error':
+                    self.errors += 1
+                self.latencies.append(time.perf_counter() - start)
+                line = status if text is None else status + " " + text
+            if not connected:
+                continue  # the client left, the answers still drain so the reader is not blocked
+            try:
+                writer.write((line + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    def counters(self):
+        '''
+        Returns the counters of the server, latencies in milliseconds over the last 10000 requests
+        '''
+        uptime = time.time() - self.start_time
+        counters = {
+            'uptime': uptime,
+            'requests': self.requests,
+            'completed': self.completed,
+            'errors': self.errors,
+            'cache_hits': self.cache_hits,
+            'shared': self.shared,
+            'batches': self.batches,
+            'mean_batch': self.batched_boards / self.batches if self.batches else 0.0,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'pending': len(self.pending),
+            'throughput': self.completed / uptime if uptime else 0.0,
+        }
+        if self.latencies:
+            p50, p95, p99 = np.percentile(self.latencies, [50, 95, 99]) * 1000
+            counters.update(latency_p50=float(p50), latency_p95=float(p95), latency_p99=float(p99))
+        return counters
+
+    async def serve(self, host='127.0.0.1', port=8765, unix=None):
+        '''
+        Serves on host:port, or on the Unix socket unix, until cancelled
+        '''
+        self.queue = asyncio.Queue(self.max_queue)
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        loop = asyncio.get_running_loop()
+        # start the workers (imports included) before the first request
+        await asyncio.gather(*[loop.run_in_executor(self.pool, solve_requests, []) for _ in range(self.workers)])
+        batcher = loop.create_task(self.batcher())
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+def solve_remote(config_strings, host='127.0.0.1', port=8765, unix=None):
+    '''
+    Blocking client: sends the boards over one connection and yields the (status, text) answers in order.
+    text is the solved string, the error message or None
+    '''
+    if unix is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(unix)
+    else:
+        sock = socket.create_connection((host, port))
+
+    def send():
+        # own thread, so a full server does not stop the answers from being read
+        for config_string in config_strings:
+            sock.sendall((config_string + "\n").encode())
+        sock.shutdown(socket.SHUT_WR)
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    with sock, sock.makefile("r") as answers:
+        for line in answers:
+            status, _, text = line.rstrip("\n").partition(" ")
+            yield status, text or None
+    sender.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Futoshiki solve service, one configuration string per line")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', default=None, help="serve on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="solver processes (default: every core)")
+    parser.add_argument('--batch-size', type=int, default=32, help="boards sent to a worker at a time")
+    parser.add_argument('--batch-delay', type=float, default=0.002,
+                        help="seconds a batch waits for more boards when it is not full")
+    parser.add_argument('--max-queue', type=int, default=1024, help="boards waiting for a batch before reads stop")
+    parser.add_argument('--cache-size', type=int, default=10000, help="recent results answered without solving")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='list')
+    parser.add_argument('--propagation', choices=PROPAGATIONS, default='fc')
+    parser.add_argument('--heuristic', choices=HEURISTICS, default='mrv')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS', default=None, help="budget of every board")
+    parser.add_argument('--max-nodes', type=int, default=None, help="node budget of every board")
+    parser.add_argument('--search', choices=SEARCHES, default='backtracking', help="search algorithm")
+    parser.add_argument('--nogoods', type=int, metavar='CAPACITY', default=10000,
+                        help="with --search nogoods, number of nogoods kept for a board")
+    args = parser.parse_args()
+    if args.search != 'backtracking' and (args.timeout is not None or args.max_nodes is not None):
+        parser.error("--timeout and --max-nodes only apply to --search backtracking")
+
+    solve_server = SolveServer(args.workers, args.batch_size, args.batch_delay, args.max_queue, args.cache_size,
+                               engine=args.engine, propagation=args.propagation, heuristic=args.heuristic,
+                               timeout=args.timeout, max_nodes=args.max_nodes, search=args.search,
+                               nogoods=args.nogoods)
+    try:
+        asyncio.run(solve_server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,386 @@
+"""
+Solver session for interactive editing.
+
+A SolverSession keeps one board between the edits of a player or an editor
+instead of building a new board from the full string each time:
+
+- a cell set by the player is propagated from the current domains and its
+  trail mark is kept, so clearing the last entries only undoes the trail
+  (older entries are undone and the later ones propagated again);
+- an inequality added or removed rebuilds the tables and the domains from
+  the entries, without parsing a string;
+- solve() returns the last solution again while it still fits the entries
+  and the inequalities, and otherwise searches from the propagated domains
+  trying the values of the last solution first;
+- hint() returns the next step for the player with the rule behind it,
+  see HINT_RULES.
+
+$python3 session.py <config string>   then one command per line on stdin:
+    set B3 4 | clear B3 | ineq A1 A2 < | ineq A1 A2 - | hint | solve | show
+"""
+import argparse
+import sys
+
+from futoshiki import ENGINES, FLIP, DomainBuckets, backtracking, render_tokens, solve_board
+
+# rules of hint(), in the order they are tried
+HINT_RULES = (
+    'conflict',  # an entry equals a row or column peer or breaks an inequality with a neighbour, clear it
+    'mistake',  # no solution keeps the entries, this one differs from a solution of the clues, clear it
+    'naked_single',  # one value is left for the cell after its row and column
+    'hidden_single',  # the value has one place left in a row or column
+    'inequality',  # a single once the inequality bounds are applied to the candidates
+    'propagation',  # a single of the alldiff propagation (bounds, singles and all-different matchings) together
+    'search',  # no deduction found, the value of the solution for the cell with the fewest candidates
+)
+
+
+class SolverSession:
+    '''
+    A board kept between edits, see the module docstring. Cells are numbered row * n + col as in futoshiki.py,
+    the clues of the starting board cannot be edited
+    '''
+
+    def __init__(self, config_string, engine='bitset', propagation='fc', heuristic='mrv'):
+        self.board = ENGINES[engine](config_string)
+        self.board.propagation = propagation
+        self.board.heuristic = heuristic
+        self.givens = list(self.board.values)
+        self.edits = []  # (var, trail mark before its value), entries set since the domains were last built
+        self.failed_at = None  # index in edits of the first entry whose propagation wiped out a domain
+        self.solution = None  # values of the last solution, tried first by the next search
+        self.incremental = 0  # cell edits applied on the trail
+        self.reloads = 0  # edits that rebuilt the domains from the entries
+        self.searches = 0
+        self.reused = 0  # solve() calls answered by the last solution
+        self.settle()
+
+    @property
+    def consistent(self):
+        # False once the entries are known to have no solution
+        return self.board.contradiction is None and self.failed_at is None
+
+    def settle(self):
+        # propagations stronger than fc start from a fixpoint of their own, never undone
+        board = self.board
+        if board.contradiction is None and board.propagation != 'fc':
+            if board.propagate(range(board.n * board.n)) is None:
+                board.contradiction = "the propagation of the entries wiped out a domain"
+        board.trail = []
+
+    def reload(self, values):
+        # rebuilds the domains from values, keeping the tables
+        self.board.load_values(values)
+        self.edits = []
+        self.failed_at = None
+        self.settle()
+        self.reloads += 1
+
+    def config_string(self):
+        '''
+        Returns the configuration string of the current entries and inequalities
+        '''
+        board = self.board
+        return board.delimiter.join(render_tokens(board.n, board.values, board.right, board.down))
+
+    def check_cell(self, var):
+        if not 0 <= var < self.board.n * self.board.n:
+            raise Exception("No cell %d on a board of size %d" % (var, self.board.n))
+        if self.givens[var]:
+            raise Exception("Cell %s is a clue" % self.board.cells[var])
+
+    def assign(self, var, value):
+        board = self.board
+        self.edits.append((var, board.mark()))
+        board.values[var] = value
+        if not self.consistent:
+            return  # the domains are no longer propagated, only the trail marks matter
+        if not (board.keep_value(var, value) and board.propagate([var])):
+            self.failed_at = len(self.edits) - 1
+
+    def set_cell(self, var, value):
+        '''
+        Enters value in the cell var. Returns False if the entries are now known to have no solution
+        '''
+        self.check_cell(var)
+        if not 1 <= value <= self.board.n:
+            raise Exception("Value %d is outside 1..%d" % (value, self.board.n))
+        if self.board.values[var] == value:
+            return self.consistent
+        if self.board.values[var]:
+            self.clear_cell(var)
+        self.assign(var, value)
+        self.incremental += 1
+        return self.consistent
+
+    def clear_cell(self, var):
+        '''
+        Empties the cell var. The entries made after it are undone too and propagated again.
+        Returns False if the entries are known to have no solution
+        '''
+        self.check_cell(var)
+        board = self.board
+        if board.values[var] == 0:
+            return self.consistent
+        index = next((index for index in range(len(self.edits) - 1, -1, -1) if self.edits[index][0] == var), None)
+        if index is None:  # entered before the last reload
+            values = list(board.values)
+            values[var] = 0
+            self.reload(values)
+            return self.consistent
+
+        later = [(other_var, board.values[other_var]) for other_var, _ in self.edits[index + 1:]]
+        board.undo(self.edits[index][1])
+        del self.edits[index:]
+        if self.failed_at is not None and self.failed_at >= index:
+            self.failed_at = None
+        board.values[var] = 0
+        for other_var, _ in later:
+            board.values[other_var] = 0
+        for other_var, value in later:
+            self.assign(other_var, value)
+        self.incremental += 1
+        return self.consistent
+
+    def set_inequality(self, var, other_var, sign):
+        '''
+        Puts the inequality sign ('<', '>' or '-' for none) between var and its adjacent cell other_var,
+        read from var. Returns False if the entries are now known to have no solution
+        '''
+        board = self.board
+        n = board.n
+        if sign not in FLIP:
+            raise Exception("Unknown inequality %r" % sign)
+        if other_var < var:
+            var, other_var, sign = other_var, var, FLIP[sign]
+        if other_var == var + 1 and var % n < n - 1:
+            board.right[var] = sign
+        elif other_var == var + n and other_var < n * n:
+            board.down[var] = sign
+        else:
+            raise Exception("Cells %d and %d are not adjacent" % (var, other_var))
+        board.build_index(board.values, board.right, board.down)
+        self.reload(board.values)
+        return self.consistent
+
+    def remove_inequality(self, var, other_var):
+        return self.set_inequality(var, other_var, '-')
+
+    def solve(self):
+        '''
+        Returns the values of a solution that keeps the entries, or None.
+        The last solution is returned again while it fits, otherwise the search starts from the propagated
+        domains and tries the values of the last solution first
+        '''
+        board = self.board
+        if not self.consistent:
+            return None
+        solution = self.solution
+        if solution is not None and all(value == 0 or value == solution[var] for var, value in enumerate(board.values)) \
+                and all(solution[small] < solution[big] for small, big in board.less_pairs):
+            self.reused += 1
+            return solution
+
+        entries = list(board.values)
+        mark = board.mark()
+        board.phase = solution
+        if board.heuristic != 'mrv':
+            board.buckets = DomainBuckets(board, degree=board.heuristic in ('degree', 'lcv'))
+        solved = backtracking(board) is not None
+        board.buckets = None
+        board.phase = None
+        if solved:
+            self.solution = list(board.values)
+        board.values[:] = entries
+        board.undo(mark)
+        self.searches += 1
+        return self.solution if solved else None
+
+    def hint(self):
+        '''
+        Next step for the player as (var, value, rule), rule one of HINT_RULES and value 0 when the entry of var
+        should be cleared. None when the board is complete or has no solution even from its clues
+        '''
+        board = self.board
+        values = board.values
+        conflict = self.conflicting_entry()
+        if conflict is not None:
+            return conflict, 0, 'conflict'
+        if not self.consistent:  # the propagation already knows the entries lead nowhere
+            return self.mistake_hint()
+        if 0 not in values:
+            return None
+        # the deductions below are only sound when the entries still lead to a solution
+        solution = self.solve()
+        if solution is None:
+            return self.mistake_hint()
+
+        candidates = self.latin_candidates()
+        single = self.single(candidates)
+        if single is not None:
+            return single
+        if self.clip_inequalities(candidates):
+            single = self.single(candidates)
+            if single is not None:
+                return single[0], single[1], 'inequality'
+        single = self.propagated_single()
+        if single is not None:
+            return single
+
+        var = min((var for var in range(len(values)) if values[var] == 0), key=lambda var: len(candidates[var]))
+        return var, solution[var], 'search'
+
+    def entries(self):
+        # cells entered by the player, the latest edits first
+        board = self.board
+        latest = [var for var, _ in reversed(self.edits)]
+        return latest + [var for var in range(board.n * board.n)
+                         if board.values[var] and not self.givens[var] and var not in latest]
+
+    def conflicting_entry(self):
+        values = self.board.values
+        for var in self.entries():
+            value = values[var]
+            if any(values[other_var] == value for other_var in self.board.peers[var]):
+                return var
+            for other_var, sign in self.board.arcs[var]:
+                if values[other_var] and not (value < values[other_var] if sign == '<' else value > values[other_var]):
+                    return var
+        return None
+
+    def mistake_hint(self):
+        # hint() when no solution keeps the entries, None when the clues alone have none
+        mistake = self.mistaken_entry()
+        return None if mistake is None else (mistake, 0, 'mistake')
+
+    def mistaken_entry(self):
+        # the latest entry that differs from a solution of the clues alone
+        board = self.board
+        clues = type(board).from_cells(board.n, self.givens, list(board.right), list(board.down))
+        solved_board, _ = solve_board(clues)
+        if solved_board is None:
+            return None
+        for var in self.entries():
+            if board.values[var] != solved_board.values[var]:
+                return var
+        return None
+
+    def latin_candidates(self):
+        # values left for every empty cell after its row and column, None for a filled cell
+        n = self.board.n
+        values = self.board.values
+        candidates = []
+        for var in range(n * n):
+            if values[var]:
+                candidates.append(None)
+            else:
+                used = {values[other_var] for other_var in self.board.peers[var]}
+                candidates.append({value for value in range(1, n + 1) if value not in used})
+        return candidates
+
+    def single(self, candidates):
+        # first naked or hidden single of the candidates as (var, value, rule), or None
+        values = self.board.values
+        for var, cell_candidates in enumerate(candidates):
+            if cell_candidates is not None and len(cell_candidates) == 1:
+                return var, next(iter(cell_candidates)), 'naked_single'
+        for unit in self.board.units:
+            placed = {values[var] for var in unit}
+            for value in range(1, self.board.n + 1):
+                if value in placed:
+                    continue
+                holders = [var for var in unit if candidates[var] is not None and value in candidates[var]]
+                if len(holders) == 1:
+                    return holders[0], value, 'hidden_single'
+        return None
+
+    def clip_inequalities(self, candidates):
+        '''
+        Removes the candidates outside the bounds of the inequalities until nothing changes.
+        Returns True if some candidate was removed
+        '''
+        values = self.board.values
+        if any(cell_candidates is not None and not cell_candidates for cell_candidates in candidates):
+            return False
+
+        def low(var):
+            return values[var] or min(candidates[var])
+
+        def high(var):
+            return values[var] or max(candidates[var])
+
+        changed = False
+        while True:
+            removed = False
+            for small, big in self.board.less_pairs:
+                for var, allowed in ((big, lambda value: value > low(small)), (small, lambda value: value < high(big))):
+                    if values[var]:
+                        continue
+                    kept = {value for value in candidates[var] if allowed(value)}
+                    if len(kept) < len(candidates[var]):
+                        candidates[var] = kept
+                        removed = True
+                        if not kept:
+                            return True
+            if not removed:
+                return changed
+            changed = True
+
+    def propagated_single(self):
+        # a value the alldiff propagation fixes for an empty cell, the domains are left as they were
+        board = self.board
+        mark = board.mark()
+        propagation = board.propagation
+        board.propagation = 'alldiff'
+        single = None
+        if board.propagate(range(board.n * board.n)) is not None:
+            for var in range(board.n * board.n):
+                if board.values[var] == 0 and board.domain_size(var) == 1:
+                    single = (var, board.domain_min(var), 'propagation')
+                    break
+        board.propagation = propagation
+        board.undo(mark)
+        return single
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Edit a board from stdin commands: set, clear, ineq, hint, solve, show")
+    parser.add_argument('config', help="configuration string of the starting board")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='bitset')
+    args = parser.parse_args()
+
+    session = SolverSession(args.config, args.engine)
+    cells = session.board.cells
+    for line in sys.stdin:
+        words = line.split()
+        if not words:
+            continue
+        try:
+            command = words[0]
+            if command == 'set':
+                ok = session.set_cell(cells.index(words[1].upper()), int(words[2]))
+            elif command == 'clear':
+                ok = session.clear_cell(cells.index(words[1].upper()))
+            elif command == 'ineq':
+                ok = session.set_inequality(cells.index(words[1].upper()), cells.index(words[2].upper()), words[3])
+            elif command == 'hint':
+                hint = session.hint()
+                if hint is None:
+                    print("no hint")
+                else:
+                    var, value, rule = hint
+                    print("%s %s (%s)" % (cells[var], "clear" if value == 0 else value, rule))
+                continue
+            elif command == 'solve':
+                solution = session.solve()
+                print("no solution" if solution is None else " ".join(str(value) for value in solution))
+                continue
+            elif command == 'show':
+                session.board.print_board()
+                continue
+            else:
+                raise Exception("Unknown command %s" % command)
+        except Exception as error:
+            print("error: %s" % error)
+            continue
+        print(session.config_string() + ("" if ok else " (no solution)"))
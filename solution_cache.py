@@ -0,0 +1,240 @@
+"""
+Solution cache in front of futoshiki.solve_board, or of any solve function
+with the same interface that leaves its outcome in board.status.
+
+Boards that only differ by a symmetry share one entry: the 8 rotations and
+reflections of the square, each with or without the value complement
+(v -> n+1-v, every '<' becomes '>'). A board is stored under the smallest
+of its 16 transformed keys and the cached solution is mapped back to the
+orientation of the board being solved. Boards that ran out of budget
+('timeout', 'cancelled') are not cached.
+
+    cache = SolutionCache(capacity=10000, path='solutions.cache', solver=solve_board)
+    solved_board, runtime = cache.solve(Board(config_string))
+    cache.save()
+
+Boards solved by other processes go through split(), which answers what it
+can and returns the strings left to solve, and merge(), which caches their
+results (see futoshiki.solve_batch and solve_stream).
+"""
+import collections
+import json
+import os
+import time
+
+from futoshiki import parse_config, solve_board
+
+
+def _symmetries(n):
+    '''
+    Returns the 8 cell permutations of the square: perm[cell] is the cell it is moved to
+    '''
+    maps = [
+        lambda r, c: (r, c),
+        lambda r, c: (c, n - 1 - r),  # rotations
+        lambda r, c: (n - 1 - r, n - 1 - c),
+        lambda r, c: (n - 1 - c, r),
+        lambda r, c: (c, r),  # transpose
+        lambda r, c: (n - 1 - c, n - 1 - r),  # anti-transpose
+        lambda r, c: (n - 1 - r, c),  # reflections
+        lambda r, c: (r, n - 1 - c),
+    ]
+    perms = []
+    for f in maps:
+        perm = []
+        for r in range(n):
+            for c in range(n):
+                new_r, new_c = f(r, c)
+                perm.append(new_r * n + new_c)
+        perms.append(perm)
+    return perms
+
+
+def _key(n, values, less):
+    '''
+    Orientation dependent key of a board: its values and the sign of every inequality
+    '''
+    signs = []
+    for r in range(n):
+        for c in range(n):
+            var = r * n + c
+            for other_var in ((var + 1,) if c < n - 1 else ()) + ((var + n,) if r < n - 1 else ()):
+                if (var, other_var) in less:
+                    signs.append('<')
+                elif (other_var, var) in less:
+                    signs.append('>')
+                else:
+                    signs.append('-')
+    return "%d:%s|%s" % (n, ','.join(map(str, values)), ''.join(signs))
+
+
+class SolutionCache:
+    '''
+    LRU cache of solutions keyed by the canonical form of the boards, in front of
+    solver(board, propagation, heuristic)
+    '''
+
+    def __init__(self, capacity=10000, path=None, solver=solve_board):
+        self.capacity = capacity
+        self.path = path
+        self.solver = solver
+        self.entries = collections.OrderedDict()  # canonical key -> solution values (None if unsolvable)
+        self.hits = 0
+        self.misses = 0
+        self._perms = {}  # n -> symmetries
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def canonical(self, board):
+        '''
+        Returns the canonical key of the board with the permutation and complement flag that produce it
+        '''
+        n = board.n
+        if n not in self._perms:
+            self._perms[n] = _symmetries(n)
+        best = None
+        for perm in self._perms[n]:
+            for complement in (False, True):
+                values = [0] * (n * n)
+                for var, value in enumerate(board.values):
+                    values[perm[var]] = n + 1 - value if complement and value else value
+                if complement:
+                    less = {(perm[big], perm[small]) for small, big in board.less_pairs}
+                else:
+                    less = {(perm[small], perm[big]) for small, big in board.less_pairs}
+                key = _key(n, values, less)
+                if best is None or key < best[0]:
+                    best = (key, perm, complement)
+        return best
+
+    def lookup(self, board):
+        '''
+        Looks the board up without solving it. Returns whether it was found and the entry to give to store()
+        once it is solved; a board that was found is left solved, with board.status 'solved' or 'unsat'
+        '''
+        n = board.n
+        key, perm, complement = self.canonical(board)
+        entry = (n, key, perm, complement)
+        if key not in self.entries:
+            self.misses += 1
+            return False, entry
+        self.hits += 1
+        self.entries.move_to_end(key)
+        solution = self.entries[key]
+        if solution is None:
+            board.status = 'unsat'
+            return True, entry
+        # back to the orientation of board
+        for var in range(n * n):
+            value = solution[perm[var]]
+            board.values[var] = n + 1 - value if complement else value
+            board.keep_value(var, board.values[var])
+        board.create_solved_board()
+        board.status = 'solved'
+        return True, entry
+
+    def store(self, entry, values):
+        '''
+        Caches values, the solution of the board looked up as entry (None if it has none)
+        '''
+        n, key, perm, complement = entry
+        solution = None
+        if values is not None:
+            solution = [0] * (n * n)
+            for var, value in enumerate(values):
+                solution[perm[var]] = n + 1 - value if complement else value
+        self.put(key, solution)
+
+    def solve(self, board, propagation='fc', heuristic='mrv'):
+        '''
+        Same as solver(board, propagation, heuristic), answering from the cache when a symmetric board was solved before
+        '''
+        start_time = time.time()
+        found, entry = self.lookup(board)
+        if found:
+            if board.status == 'unsat':
+                return None, -1
+            return board, time.time() - start_time
+
+        solved_board, runtime = self.solver(board, propagation, heuristic)
+        if board.status not in ('solved', 'unsat'):
+            return solved_board, runtime  # out of budget, the board may still have a solution
+        self.store(entry, solved_board.values if solved_board is not None else None)
+        return solved_board, runtime
+
+    def split(self, config_strings, board_class):
+        '''
+        Front half of solving configuration strings somewhere else, e.g. on the workers of futoshiki.solve_batch().
+        Returns the plan to give to merge() and the strings the cache missed, left to be solved
+        '''
+        plan = []
+        misses = []
+        for config_string in config_strings:
+            start_time = time.time()
+            try:
+                board = board_class(config_string)
+            except Exception:
+                plan.append((False, None))  # not a board, reported by the solver
+                misses.append(config_string)
+                continue
+            found, entry = self.lookup(board)
+            if not found:
+                plan.append((False, entry))
+                misses.append(config_string)
+            elif board.status == 'unsat':
+                plan.append((True, (None, -1)))
+            else:
+                plan.append((True, (board.get_config_str(), time.time() - start_time)))
+        return plan, misses
+
+    def merge(self, plan, results, complete=True):
+        '''
+        Back half of split(): caches the (solved string or None, runtime) results of the missed strings and puts them
+        back among the answers of the cache. Without a solution a board is only cached as unsolvable when complete,
+        i.e. the solver had no budget to run out of.
+        Returns the (solved string or None, runtime) pairs of all the strings of split(), in order
+        '''
+        results = iter(results)
+        answers = []
+        for found, value in plan:
+            if found:
+                answers.append(value)
+                continue
+            solved_str, runtime = next(results)
+            if value is not None and (solved_str is not None or complete):
+                self.store(value, parse_config(solved_str)[2] if solved_str is not None else None)
+            answers.append((solved_str, runtime))
+        return answers
+
+    def put(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)  # least recently used
+
+    def stats(self):
+        '''
+        Returns the hit/miss counters
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path=None):
+        '''
+        Writes the entries, least recently used first, to path (default: the path given to the constructor)
+        '''
+        path = path or self.path
+        tmp_path = path + '.tmp'
+        with open(tmp_path, "w") as cachefile:
+            json.dump({'entries': list(self.entries.items())}, cachefile)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path, "r") as cachefile:
+            for key, solution in json.load(cachefile)['entries']:
+                self.put(key, solution)
@@ -0,0 +1,28 @@
+from session import SolverSession
+
+BOARD = '0-0<0---0<2-0<--0-0-0'
+
+
+def test_hint_reports_mistake_once_the_entries_are_unsolvable():
+    session = SolverSession(BOARD)
+    assert not session.set_cell(0, 1)
+    assert session.hint() == (0, 0, 'mistake')
+
+
+def test_hint_after_clearing_the_mistake():
+    session = SolverSession(BOARD)
+    session.set_cell(0, 1)
+    session.clear_cell(0)
+    assert session.consistent
+    var, value, rule = session.hint()
+    assert rule not in ('conflict', 'mistake')
+    assert session.solve()[var] == value
+
+
+def test_hint_gives_no_deduction_when_the_entries_have_no_solution():
+    # forward checking does not see it, but no solution has 1 at both B1 and C3
+    session = SolverSession('3<0-0-0--<-0<0-4-3----0-0-0-0----0<3-0-0')
+    session.set_cell(4, 1)
+    session.set_cell(10, 1)
+    assert session.consistent and session.solve() is None
+    assert session.hint() == (10, 0, 'mistake')
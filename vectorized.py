@@ -0,0 +1,172 @@
+"""
+NumPy batch solver for many boards of the same size.
+
+The candidates of B boards are held in one boolean tensor of shape
+(B, n, n, n): candidates[b, row, col, v - 1] is True while v is possible for
+that cell. Singleton elimination along rows and columns, hidden singles and
+inequality bounds run as array operations over the whole batch until
+nothing changes. Only the boards that propagation leaves open are handed to
+the per-board backtracking search of futoshiki.py.
+
+$python3 vectorized.py [--n 5] [--boards 2000] [--clues 0.4]   compares against the per-board path
+"""
+import argparse
+import time
+
+import numpy as np
+
+from futoshiki import DELIMITER, ENGINES, parse_config, render_tokens, solve_board
+
+
+def parse_batch(config_strings):
+    '''
+    Parses configuration strings of one size with parse_config(), which raises on a board that is not valid.
+    Returns n, the values (B, n, n), the horizontal (B, n, n-1) and vertical (B, n-1, n) inequalities,
+    +1 where the first cell is smaller ('<'), -1 where it is bigger ('>'), 0 otherwise, and the parsed boards
+    '''
+    boards = [parse_config(config_string) for config_string in config_strings]
+    n = boards[0][0]
+    if any(board[0] != n for board in boards):
+        raise Exception("All the boards of a batch must have the same size")
+    sign = {'<': 1, '>': -1, '-': 0}
+    values = np.array([board[2] for board in boards], dtype=np.int64).reshape(-1, n, n)
+    right = np.array([[sign[s] for s in board[3]] for board in boards], dtype=np.int8).reshape(-1, n, n)
+    down = np.array([[sign[s] for s in board[4]] for board in boards], dtype=np.int8).reshape(-1, n, n)
+    return n, values, right[:, :, :-1], down[:, :-1, :], boards
+
+
+def initial_candidates(n, values):
+    '''
+    Candidate tensor of the clues: a clue keeps its value, an empty cell keeps 1..n
+    '''
+    candidates = np.ones(values.shape + (n,), dtype=bool)
+    clues = values > 0
+    candidates[clues] = np.arange(1, n + 1)[None, :] == values[clues][:, None]
+    return candidates
+
+
+def propagate_batch(candidates, horizontal, vertical):
+    '''
+    Runs the propagation on every board of the batch until no candidate is removed.
+    Returns the candidates and, per board, whether a contradiction was found
+    '''
+    n = candidates.shape[1]
+    numbers = np.arange(1, n + 1)
+    less_h = (horizontal == 1)[..., None]
+    greater_h = (horizontal == -1)[..., None]
+    less_v = (vertical == 1)[..., None]
+    greater_v = (vertical == -1)[..., None]
+
+    remaining = candidates.sum()
+    while True:
+        # singletons remove their value from their row and column
+        assigned = candidates & (candidates.sum(-1) == 1)[..., None]
+        in_row = assigned.any(axis=2)  # (B, row, value)
+        in_col = assigned.any(axis=1)  # (B, col, value)
+        candidates &= ~(in_row[:, :, None, :] | in_col[:, None, :, :]) | assigned
+
+        # hidden singles: a value with a single place in a row or a column
+        hidden = candidates & ((candidates.sum(axis=2) == 1)[:, :, None, :] |
+                               (candidates.sum(axis=1) == 1)[:, None, :, :])
+        candidates = np.where(hidden.any(-1)[..., None], hidden, candidates)
+
+        # bounds of the inequalities, empty cells get 1..n and are caught below
+        low = candidates.argmax(-1) + 1
+        high = n - candidates[..., ::-1].argmax(-1)
+        candidates[:, :, 1:] &= ~less_h | (numbers > low[:, :, :-1, None])
+        candidates[:, :, :-1] &= ~less_h | (numbers < high[:, :, 1:, None])
+        candidates[:, :, 1:] &= ~greater_h | (numbers < high[:, :, :-1, None])
+        candidates[:, :, :-1] &= ~greater_h | (numbers > low[:, :, 1:, None])
+        candidates[:, 1:] &= ~less_v | (numbers > low[:, :-1, :, None])
+        candidates[:, :-1] &= ~less_v | (numbers < high[:, 1:, :, None])
+        candidates[:, 1:] &= ~greater_v | (numbers < high[:, :-1, :, None])
+        candidates[:, :-1] &= ~greater_v | (numbers > low[:, 1:, :, None])
+
+        now = candidates.sum()
+        if now == remaining:
+            break
+        remaining = now
+
+    # contradictions: an empty cell, a value with no place left, two singletons with the same value
+    sizes = candidates.sum(-1)
+    assigned = candidates & (sizes == 1)[..., None]
+    failed = ((sizes == 0).any(axis=(1, 2)) |
+              (candidates.sum(axis=2) == 0).any(axis=(1, 2)) |
+              (candidates.sum(axis=1) == 0).any(axis=(1, 2)) |
+              (assigned.sum(axis=2) > 1).any(axis=(1, 2)) |
+              (assigned.sum(axis=1) > 1).any(axis=(1, 2)))
+    return candidates, failed
+
+
+def write_values(config_string, board, values):
+    '''
+    Returns config_string, parsed as board by parse_config(), with its cells replaced by values (0 keeps the cell
+    empty)
+    '''
+    n, _, _, right, down = board
+    delimiter = DELIMITER if DELIMITER in config_string else ''
+    return delimiter.join(render_tokens(n, [int(value) for value in np.ravel(values)], right, down))
+
+
+def solve_vectorized(config_strings, engine='list', propagation='fc'):
+    '''
+    Solves boards of one size: batch propagation first, then per-board search for the boards left open.
+    Returns the solved strings (None when there is no solution), in input order,
+    and the number of boards solved by propagation alone, by search and found unsolvable
+    '''
+    config_strings = list(config_strings)
+    n, values, horizontal, vertical, boards = parse_batch(config_strings)
+    candidates, failed = propagate_batch(initial_candidates(n, values), horizontal, vertical)
+
+    sizes = candidates.sum(-1)
+    solved = ~failed & (sizes == 1).all(axis=(1, 2))
+    propagated = np.where(sizes == 1, candidates.argmax(-1) + 1, 0)
+
+    solutions = []
+    counts = {'propagation': 0, 'search': 0, 'unsolvable': 0}
+    for index, config_string in enumerate(config_strings):
+        if failed[index]:
+            solutions.append(None)
+            counts['unsolvable'] += 1
+        elif solved[index]:
+            solutions.append(write_values(config_string, boards[index], propagated[index]))
+            counts['propagation'] += 1
+        else:
+            # the cells fixed by the propagation become clues of the per-board search
+            board = ENGINES[engine].from_cells(n, propagated[index].ravel().tolist(), boards[index][3], boards[index][4])
+            solved_board, _ = solve_board(board, propagation)
+            if solved_board is None:
+                solutions.append(None)
+                counts['unsolvable'] += 1
+            else:
+                solutions.append(write_values(config_string, boards[index], solved_board.values))
+                counts['search'] += 1
+    return solutions, counts
+
+
+if __name__ == '__main__':
+    from benchmark import puzzle_set
+    from futoshiki import solve_batch
+
+    parser = argparse.ArgumentParser(description="Throughput of the batch solver against the per-board path")
+    parser.add_argument('--n', type=int, default=5)
+    parser.add_argument('--boards', type=int, default=2000)
+    parser.add_argument('--clues', type=float, default=0.4)
+    parser.add_argument('--inequalities', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config_strings = puzzle_set(args.n, args.clues, args.inequalities, args.boards, args.seed)
+
+    start_time = time.time()
+    solutions, counts = solve_vectorized(config_strings)
+    batch_time = time.time() - start_time
+
+    start_time = time.time()
+    solve_batch(config_strings, workers=1)
+    board_time = time.time() - start_time
+
+    print("Boards = {:d} ({:d}x{:d})".format(len(config_strings), args.n, args.n))
+    print("Solved by Propagation = {propagation:d}, by Search = {search:d}, Unsolvable = {unsolvable:d}".format(**counts))
+    print("Batch Throughput = {:.2f} boards/sec".format(len(config_strings) / batch_time))
+    print("Per-Board Throughput = {:.2f} boards/sec".format(len(config_strings) / board_time))